@@ -0,0 +1,147 @@
+"""Sound effects played off the main thread, so a beep never holds up a frame."""
+
+import io
+import math
+import queue
+import threading
+import time
+import wave
+
+import numpy as np
+
+
+def synthesize_tone(frequency, duration_ms, sample_rate=22050, volume=0.3):
+    """A sine tone as 16-bit mono WAV bytes, faded in and out so it doesn't click."""
+    n = max(1, sample_rate * duration_ms // 1000)
+    t = np.arange(n) / sample_rate
+    samples = np.sin(2 * math.pi * frequency * t) * volume
+    fade = min(n // 2, sample_rate // 200)  # 5 ms
+    if fade:
+        ramp = np.linspace(0, 1, fade)
+        samples[:fade] *= ramp
+        samples[-fade:] *= ramp[::-1]
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes((samples * 32767).astype('<i2').tobytes())
+    return buffer.getvalue()
+
+
+class NullBackend:
+    """Plays nothing; for headless runs and machines without audio."""
+
+    def load(self, name, wav):
+        return None
+
+    def play(self, sound):
+        pass
+
+
+class WinsoundBackend:
+    """winsound.PlaySound from memory. Blocks for the sound's length, which
+    only ever stalls the audio thread."""
+
+    def __init__(self):
+        import winsound
+        self.winsound = winsound
+
+    def load(self, name, wav):
+        return wav
+
+    def play(self, sound):
+        self.winsound.PlaySound(sound, self.winsound.SND_MEMORY)
+
+
+class PandaBackend:
+    """Panda3D's sound effects manager, reading the WAVs from a ramdisk."""
+
+    mount_point = '/sound-cache'
+
+    def __init__(self, manager):
+        from panda3d.core import VirtualFileMountRamdisk, VirtualFileSystem
+        self.manager = manager
+        self.vfs = VirtualFileSystem.get_global_ptr()
+        self.vfs.mount(VirtualFileMountRamdisk(), self.mount_point, 0)
+
+    def load(self, name, wav):
+        from panda3d.core import Filename
+        path = Filename(f'{self.mount_point}/{name}.wav')
+        self.vfs.write_file(path, wav, False)
+        return self.manager.get_sound(path)
+
+    def play(self, sound):
+        sound.play()
+
+
+def default_backend(app=None):
+    """Panda3D's audio if app has a working sound effects manager, winsound
+    on Windows, otherwise silence."""
+    managers = getattr(app, 'sfxManagerList', None)
+    if managers and managers[0].is_valid():
+        return PandaBackend(managers[0])
+    try:
+        return WinsoundBackend()
+    except ImportError:
+        return NullBackend()
+
+
+class AudioService:
+    """Plays tones on a worker thread fed by a bounded queue.
+
+    tone() only queues a request: if the queue is full, or the same tone
+    was asked for less than repeat_interval seconds ago, the request is
+    dropped instead of waiting. Each tone is synthesised and loaded into
+    the backend once, then replayed from the cache.
+    """
+
+    def __init__(self, backend, queue_size=16, repeat_interval=0.05):
+        self.backend = backend
+        self.repeat_interval = repeat_interval
+        self.queue = queue.Queue(queue_size)
+        self.sounds = {}      # (frequency, duration_ms) -> backend sound
+        self.last_played = {}  # (frequency, duration_ms) -> time it was last queued
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='audio', daemon=True)
+        self.thread.start()
+
+    def tone(self, frequency, duration_ms):
+        """Queue a beep. Returns False if it was dropped."""
+        key = (frequency, duration_ms)
+        now = time.monotonic()
+        if now - self.last_played.get(key, -math.inf) < self.repeat_interval:
+            return False
+        try:
+            self.queue.put_nowait(key)
+        except queue.Full:
+            return False
+        self.last_played[key] = now
+        return True
+
+    def _run(self):
+        while True:
+            key = self.queue.get()
+            if key is None or not self.running:
+                return
+            try:
+                if key not in self.sounds:
+                    frequency, duration_ms = key
+                    self.sounds[key] = self.backend.load(f'{frequency}_{duration_ms}', synthesize_tone(frequency, duration_ms))
+                self.backend.play(self.sounds[key])
+            except Exception:
+                pass  # a broken sound isn't worth crashing over
+
+    def close(self, timeout=1):
+        """Stop the worker after the sound it is playing, dropping the rest.
+
+        Never blocks on a full queue: the stop flag reaches a busy worker,
+        and the None only has to wake an idle one. Waits up to timeout
+        seconds for the worker to finish.
+        """
+        self.running = False
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass  # the worker is busy, and sees the flag when it's done
+        self.thread.join(timeout)
@@ -0,0 +1,237 @@
+"""Headless benchmarks for world generation, meshing, physics, culling and targeting.
+
+    python benchmarks.py [--quick] [--output FILE] [--compare OLD_FILE]
+
+No window is opened: everything timed here lives in the engine-free
+modules the game is built from. Seeds are fixed, so every run does the
+same work and results can be compared across commits. Each case reports
+the best and median milliseconds per call over several repeats, and the
+results go to a JSON file. With --compare, cases whose best time got more
+than --threshold times slower than in OLD_FILE are listed and the exit
+status is 1.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from blocks import BLOCK_RGBA, BLOCK_TRANSPARENT, BLOCK_TYPES
+from culling import visible_chunks
+from inventory import Inventory
+from items import DroppedItems
+from lod import TileMeshes, lod_tiles, root_of
+from meshing import build_chunk_mesh
+from occlusion import camera_cell, reachable_sections, section_connectivity
+from particles import ParticleSystem
+from physics import PlayerBody
+from region import RegionStore
+from streaming import chunks_in_radius
+from terrain import generate_chunk, generate_region, get_biome_blend, set_seed
+from world import CHUNK_SIZE, BlockIndex
+
+SEED = 12345
+WORLD_RADII = (1, 2, 4)  # chunk radii of the worlds generated
+ITEM_COUNTS = (100, 1000, 5000)
+LOOKUPS = 100000  # block lookups per call
+RAYS = 1000       # targeting raycasts per call
+MOVES = 1000      # player movement steps per call
+REACH = 7
+LOD_DISTANCE = 256
+
+
+def commit():
+    """Current git commit of the tree, or None outside a checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench(results, name, run, setup=None, repeat=5, number=1):
+    """Time run() number times per repeat; setup() runs untimed before each repeat."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        times.append((time.perf_counter() - start) / number * 1000)
+    results[name] = {'best_ms': min(times), 'median_ms': statistics.median(times), 'repeat': repeat, 'number': number}
+    print(f'{name:<40} {min(times):10.3f} ms  (median {statistics.median(times):.3f})')
+
+
+def build_world(radius):
+    """A BlockIndex holding every chunk within radius of (0, 0)."""
+    world = BlockIndex()
+    for cx, cz in chunks_in_radius((0, 0), radius):
+        world.add_chunk(cx, cz, generate_chunk(cx, cz))
+    return world
+
+
+def bench_generation(results, repeat):
+    for radius in WORLD_RADII:
+        # A fresh seed empties the noise caches, so each repeat generates from scratch
+        bench(results, f'generate_world r={radius} ({len(chunks_in_radius((0, 0), radius))} chunks)',
+              lambda: build_world(radius), setup=lambda: set_seed(SEED), repeat=repeat)
+    for size in (16, 64, 256):
+        bench(results, f'generate_region {size}x{size}', lambda: generate_region(0, 0, size, size),
+              setup=lambda: set_seed(SEED), repeat=repeat)
+    # Distant terrain: every heightmap tile around a player at the origin, from scratch
+    tiling = {}
+    for tile in lod_tiles((0, 20, 0), set(chunks_in_radius((0, 0), 3)), LOD_DISTANCE):
+        tiling.setdefault(root_of(tile), []).append(tile)
+    bench(results, f'lod meshes {len(tiling)} roots', lambda: [TileMeshes().build(tiles) for tiles in tiling.values()],
+          setup=lambda: set_seed(SEED), repeat=repeat)
+    columns = np.random.default_rng(SEED).integers(-500, 500, (1000, 2)).tolist()
+    bench(results, 'get_biome_blend x1000',
+          lambda: [get_biome_blend(x, z) for x, z in columns], setup=lambda: set_seed(SEED), repeat=repeat)
+
+
+def bench_world(results, world, repeat):
+    rng = np.random.default_rng(SEED)
+    span = CHUNK_SIZE * 4
+    positions = [tuple(p) for p in rng.uniform((-span, 0, -span), (span, 30, span), (LOOKUPS, 3)).tolist()]
+    bench(results, f'block lookup x{LOOKUPS}', lambda: [world.get(p) for p in positions], repeat=repeat)
+
+    padded = world.padded_chunk(0, 0)
+    bench(results, 'build_chunk_mesh', lambda: build_chunk_mesh(padded, (0, 0), BLOCK_RGBA, BLOCK_TRANSPARENT),
+          repeat=repeat, number=10)
+
+    # Targeting: rays from head height above the terrain in random directions
+    origins = []
+    for x, z in rng.uniform(-span, span, (RAYS, 2)).tolist():
+        top = world.column_top(x, z)
+        origins.append((x, (top or 0) + 2, z))
+    directions = rng.normal(size=(RAYS, 3)).tolist()
+    bench(results, f'targeting raycast x{RAYS}',
+          lambda: [world.raycast(o, d, REACH) for o, d in zip(origins, directions)], repeat=repeat)
+
+    # Player movement: walking a circle at sprint speed, 60 frames a second
+    body = PlayerBody(world, (0, world.column_top(0, 0) + 1, 0), step_height=1)
+    steps = [(math.cos(i / 50) * 10 / 60, math.sin(i / 50) * 10 / 60) for i in range(MOVES)]
+    bench(results, f'player move x{MOVES}', lambda: [body.move(dx, dz, False, 1 / 60) for dx, dz in steps],
+          repeat=repeat)
+
+    chunks = list(world.chunks)
+    bench(results, f'culling ({len(chunks)} chunks)',
+          lambda: visible_chunks(chunks, (0, 20, 0), (0.6, -0.2, 0.77), (0.79, 0, -0.61), (0.12, 0.98, 0.16),
+                                 (100, 70), 48),
+          repeat=repeat, number=100)
+    bench(results, 'section_connectivity', lambda: section_connectivity(world.chunks[(0, 0)], BLOCK_TRANSPARENT),
+          repeat=repeat, number=10)
+    sections = {chunk: section_connectivity(blocks, BLOCK_TRANSPARENT) for chunk, blocks in world.chunks.items()}
+    bench(results, f'occlusion walk ({len(chunks)} chunks)',
+          lambda: reachable_sections(camera_cell((0, world.column_top(0, 0) + 1.6, 0)), sections),
+          repeat=repeat, number=20)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = RegionStore(directory)
+        saved = chunks[:25]
+        bench(results, f'region save x{len(saved)}', lambda: [store.save(cx, cz, world.chunk_blocks(cx, cz)) for cx, cz in saved],
+              repeat=repeat, number=20)
+        bench(results, f'region load x{len(saved)}', lambda: [store.load(cx, cz) for cx, cz in saved],
+              repeat=repeat, number=20)
+        store.close()
+
+
+def bench_items(results, world, repeat):
+    names = [block.name for block in BLOCK_TYPES[1:]]
+    span = CHUNK_SIZE * 4
+    for count in ITEM_COUNTS:
+        items = []
+
+        def drop():
+            # Spread out high above the ground, so every stack is still falling while timed
+            rng = np.random.default_rng(SEED)
+            items[:] = [DroppedItems(world, lambda vertices: None, lambda block, n: n, lambda: (1e6, 0, 1e6), seed=SEED)]
+            for position, block in zip(rng.uniform((-span, 40, -span), (span, 60, span), (count, 3)).tolist(),
+                                       rng.integers(1, len(BLOCK_TYPES), count).tolist()):
+                items[0].drop(position, block)
+
+        bench(results, f'item physics tick, {count} falling', lambda: items[0].tick(0.05), setup=drop, repeat=repeat, number=20)
+        bench(results, f'item draw, {count}', lambda: items[0].interpolate(0.5), setup=drop, repeat=repeat, number=20)
+    inventory = Inventory(36)
+
+    def fill_and_empty():
+        for name in names:
+            inventory.add(name, 100)
+        for name in names:
+            inventory.remove(name, 100)
+
+    bench(results, 'inventory add/remove', fill_and_empty, repeat=repeat, number=100)
+
+
+def bench_particles(results, repeat):
+    particles = ParticleSystem(1024, lambda vertices: None, seed=SEED)
+
+    def fill():
+        for i in range(1024 // 12):
+            particles.emit((i, 20, 0), (1, 0, 0, 1), 12)
+
+    bench(results, 'particles tick + draw, 1024', lambda: (particles.tick(0.05), particles.interpolate(0.5)),
+          setup=fill, repeat=repeat, number=5)
+
+
+def compare(results, old_path, threshold):
+    """Print cases whose best time got more than threshold times slower; returns them."""
+    with open(old_path) as f:
+        old = json.load(f)['results']
+    regressions = []
+    for name, result in results.items():
+        if name not in old:
+            continue
+        ratio = result['best_ms'] / max(old[name]['best_ms'], 1e-9)
+        if ratio > threshold:
+            regressions.append(name)
+            print(f'SLOWER {name}: {old[name]["best_ms"]:.3f} -> {result["best_ms"]:.3f} ms ({ratio:.2f}x)')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='fewer repeats, for a fast sanity check')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file to write the results to')
+    parser.add_argument('--compare', help='earlier results file to check for regressions against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio counted as a regression')
+    args = parser.parse_args()
+    repeat = 3 if args.quick else 7
+
+    results = {}
+    set_seed(SEED)
+    bench_generation(results, repeat)
+    set_seed(SEED)
+    world = build_world(max(WORLD_RADII))
+    bench_world(results, world, repeat)
+    bench_items(results, world, repeat)
+    bench_particles(results, repeat)
+
+    report = {
+        'commit': commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'seed': SEED,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Wrote {args.output}')
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Block type registry: every block's numeric ID and properties.
+
+The world stores blocks as these IDs (one byte each), so anything that
+needs to know about a block looks it up here by index.
+"""
+
+import numpy as np
+
+
+class BlockType:
+    def __init__(self, id, name, color, hardness, drop, transparent):
+        self.id = id
+        self.name = name
+        self.color = color              # (r, g, b), 0..1
+        self.hardness = hardness        # seconds to mine
+        self.drop = drop                # item name dropped when mined, or None
+        self.transparent = transparent  # faces behind it still get drawn
+
+
+BLOCK_TYPES = []  # indexed by ID
+BLOCK_IDS = {}    # name -> ID
+
+
+def register_block(name, color, hardness=0.5, drop=None, transparent=False):
+    """Add a block type and return its ID."""
+    block = BlockType(len(BLOCK_TYPES), name, color, hardness, drop, transparent)
+    BLOCK_TYPES.append(block)
+    BLOCK_IDS[name] = block.id
+    return block.id
+
+
+# IDs are saved in region files, so only ever add new blocks at the end
+AIR = register_block('air', (0, 0, 0), hardness=0, transparent=True)
+GRASS = register_block('grass', (0, 1, 0), hardness=0.3, drop='grass')
+DIRT = register_block('dirt', (0.65, 0.16, 0.16), hardness=0.4, drop='dirt')
+STONE = register_block('stone', (0.25, 0.25, 0.25), hardness=1.0, drop='stone')
+SAND = register_block('sand', (0.93, 0.87, 0.68), drop='sand')
+WOOD = register_block('wood', (0.6, 0.4, 0.2), hardness=0.6, drop='wood')
+LEAVES = register_block('leaves', (0.35, 0.52, 0.3), hardness=0.15, drop='leaves')
+CACTUS = register_block('cactus', (0.2, 0.6, 0.2), drop='cactus')
+COBBLE = register_block('cobble', (0.5, 0.5, 0.5))
+GLASS = register_block('glass', (0, 1, 1), transparent=True)
+BRICK = register_block('brick', (1, 0, 0))
+
+# Per-ID lookup tables for the vectorised mesher
+BLOCK_RGBA = np.array([b.color + (1,) for b in BLOCK_TYPES], dtype=np.float32)
+BLOCK_TRANSPARENT = np.array([b.transparent for b in BLOCK_TYPES])
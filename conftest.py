@@ -0,0 +1 @@
+"""Lets pytest import the game's modules from the repository root."""
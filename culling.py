@@ -0,0 +1,74 @@
+"""Chunk visibility: render distance and camera frustum tests on chunk boxes.
+
+Every test runs on all chunks at once with NumPy, so culling the whole
+loaded world costs the same few array operations each frame.
+"""
+
+import math
+
+import numpy as np
+
+from world import CHUNK_SIZE, WORLD_HEIGHT
+
+
+def chunk_bounds(chunks):
+    """(mins, maxs) corner arrays, shape (n, 3), of the boxes of (cx, cz) chunks."""
+    keys = np.asarray(chunks, dtype=np.float64).reshape(-1, 2)
+    # Blocks fill x-0.5..x+0.5, y-1..y, z-0.5..z+0.5 (see meshing.py)
+    mins = np.stack((keys[:, 0] * CHUNK_SIZE - 0.5, np.full(len(keys), -1.0), keys[:, 1] * CHUNK_SIZE - 0.5), axis=1)
+    maxs = mins + (CHUNK_SIZE, WORLD_HEIGHT, CHUNK_SIZE)
+    return mins, maxs
+
+
+def tile_bounds(tiles):
+    """(mins, maxs) corner arrays of the boxes of (x0, z0, size) terrain tiles (see lod.py)."""
+    tiles = np.asarray(tiles, dtype=np.float64).reshape(-1, 3)
+    mins = np.stack((tiles[:, 0] - 0.5, np.full(len(tiles), -1.0), tiles[:, 1] - 0.5), axis=1)
+    maxs = mins + np.stack((tiles[:, 2], np.full(len(tiles), float(WORLD_HEIGHT)), tiles[:, 2]), axis=1)
+    return mins, maxs
+
+
+def frustum_planes(position, forward, right, up, fov):
+    """The four side planes of a perspective view as (normals, offsets).
+
+    fov is the (horizontal, vertical) field of view in degrees. A point p is
+    inside a plane when normal . p + offset >= 0. There is no near or far
+    plane; the render distance stands in for the far one.
+    """
+    forward, right, up = np.asarray(forward, float), np.asarray(right, float), np.asarray(up, float)
+    half_h = math.radians(fov[0]) / 2
+    half_v = math.radians(fov[1]) / 2
+    normals = np.array((
+        forward * math.sin(half_h) + right * math.cos(half_h),  # left
+        forward * math.sin(half_h) - right * math.cos(half_h),  # right
+        forward * math.sin(half_v) + up * math.cos(half_v),     # bottom
+        forward * math.sin(half_v) - up * math.cos(half_v),     # top
+    ))
+    offsets = -normals @ np.asarray(position, float)
+    return normals, offsets
+
+
+def visible_chunks(chunks, position, forward, right, up, fov, max_distance):
+    """Boolean mask over chunks: within max_distance (horizontally) and in view."""
+    mins, maxs = chunk_bounds(chunks)
+    return visible_boxes(mins, maxs, position, forward, right, up, fov, max_distance)
+
+
+def visible_boxes(mins, maxs, position, forward, right, up, fov, max_distance):
+    """Boolean mask over boxes: within max_distance (horizontally) and in view.
+
+    A box counts as in view unless it lies entirely behind one of the
+    frustum planes, so boxes are only ever culled when surely hidden.
+    """
+    # Horizontal distance from the camera to the nearest point of each box
+    px, pz = position[0], position[2]
+    dx = np.maximum(np.maximum(mins[:, 0] - px, px - maxs[:, 0]), 0)
+    dz = np.maximum(np.maximum(mins[:, 2] - pz, pz - maxs[:, 2]), 0)
+    visible = dx * dx + dz * dz <= max_distance * max_distance
+
+    normals, offsets = frustum_planes(position, forward, right, up, fov)
+    for normal, offset in zip(normals, offsets):
+        # The box corner furthest along the normal decides
+        corner = np.where(normal > 0, maxs, mins)
+        visible &= corner @ normal + offset >= 0
+    return visible
@@ -0,0 +1,135 @@
+"""Inventories: numbered item slots with per-type stack lookup."""
+
+import heapq
+
+
+class Slot:
+    """One inventory slot: an item type and how many, or (None, 0) when empty."""
+
+    __slots__ = ('type', 'count')
+
+    def __init__(self):
+        self.type = None
+        self.count = 0
+
+
+class Inventory:
+    """size slots of item stacks, up to max_stack each.
+
+    Works for the hotbar as well as bigger inventories and containers:
+    stacks of each item type are indexed, with the ones that still have
+    room kept apart, and empty slots sit in a heap, so adding or removing
+    items never scans the slots. Changed slot indices are passed to every
+    listener after each change.
+    """
+
+    def __init__(self, size, max_stack=64):
+        self.slots = [Slot() for _ in range(size)]
+        self.max_stack = max_stack
+        self.stacks = {}  # type -> {slot index: None} of every stack of it
+        self.open = {}    # type -> {slot index: None} of its stacks that aren't full
+        self.totals = {}  # type -> count over all slots
+        self.free = list(range(size))  # heap of empty slot indices; may hold stale entries
+        self.listeners = []
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __getitem__(self, index):
+        return self.slots[index]
+
+    def count(self, item):
+        """How many of item there are across all slots."""
+        return self.totals.get(item, 0)
+
+    def subscribe(self, listener):
+        """Call listener(indices) with the changed slots after every change."""
+        self.listeners.append(listener)
+
+    def _notify(self, indices):
+        if indices:
+            for listener in self.listeners:
+                listener(indices)
+
+    def _set(self, index, item, count):
+        """Put count of item in a slot, keeping the indexes up to date."""
+        slot = self.slots[index]
+        if slot.type is not None:
+            self.stacks[slot.type].pop(index, None)
+            self.open[slot.type].pop(index, None)
+            self.totals[slot.type] -= slot.count
+        if not count:
+            item = None
+        slot.type = item
+        slot.count = count
+        if item is None:
+            heapq.heappush(self.free, index)
+            return
+        self.stacks.setdefault(item, {})[index] = None
+        self.totals[item] = self.totals.get(item, 0) + count
+        self.open.setdefault(item, {})
+        if count < self.max_stack:
+            self.open[item][index] = None
+
+    def _pop_free(self):
+        """Lowest empty slot index, or None if every slot is in use."""
+        while self.free:
+            index = heapq.heappop(self.free)
+            if self.slots[index].type is None:
+                return index
+        return None
+
+    def add(self, item, count=1):
+        """Add count of item, topping up existing stacks before starting new
+        ones, lowest slot first. Returns how many didn't fit."""
+        changed = []
+        # A type has only a few stacks with room, so sorting them is cheap
+        for index in sorted(self.open.get(item, ())):
+            if not count:
+                break
+            slot = self.slots[index]
+            added = min(count, self.max_stack - slot.count)
+            self._set(index, item, slot.count + added)
+            count -= added
+            changed.append(index)
+        while count:
+            index = self._pop_free()
+            if index is None:
+                break
+            added = min(count, self.max_stack)
+            self._set(index, item, added)
+            count -= added
+            changed.append(index)
+        self._notify(changed)
+        return count
+
+    def remove(self, item, count=1):
+        """Take up to count of item, emptying the highest slots first. Returns
+        how many were taken."""
+        changed = []
+        taken = 0
+        for index in sorted(self.stacks.get(item, ()), reverse=True):
+            if taken == count:
+                break
+            slot = self.slots[index]
+            removed = min(count - taken, slot.count)
+            self._set(index, item, slot.count - removed)
+            taken += removed
+            changed.append(index)
+        self._notify(changed)
+        return taken
+
+    def take(self, index, count=1):
+        """Take up to count from one slot. Returns (type, how many)."""
+        slot = self.slots[index]
+        item = slot.type
+        taken = min(count, slot.count)
+        if taken:
+            self._set(index, item, slot.count - taken)
+            self._notify([index])
+        return item, taken
+
+    def put(self, index, item, count):
+        """Replace a slot's contents, e.g. when dragging stacks around."""
+        self._set(index, item, count)
+        self._notify([index])
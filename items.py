@@ -0,0 +1,205 @@
+"""Dropped items: every stack on the ground in struct-of-arrays form."""
+
+import math
+
+import numpy as np
+
+from blocks import BLOCK_RGBA
+from particles import CUBE_CORNERS
+
+
+class DroppedItems:
+    """All dropped item stacks, stepped together as one TickScheduler object.
+
+    Each stack's position, velocity, block ID, count and despawn time sit in
+    parallel arrays. Falling stacks move in one vectorised step. Stacks at
+    rest go into a spatial grid, so a landing stack can merge into a resting
+    stack of the same type nearby, and pickups only look at the cells around
+    the collector. tick() returns False once nothing is falling and no stack
+    is due to be picked up or to expire; see due() for when to wake it.
+
+    world is the BlockIndex items land on, draw(vertices) gets all stacks as
+    one interleaved position/RGBA float32 array, pick_up(block, count)
+    returns how many didn't fit, and collector() is where they get picked
+    up from (the player). clock() gives the simulation time in seconds (the
+    scheduler's), so stacks keep expiring while asleep; without it, time
+    only passes in tick().
+    """
+
+    gravity = 1.0
+    bounce = 0.5
+    size = 0.25
+    spin_speed = 90  # degrees per second
+
+    def __init__(self, world, draw, pick_up, collector, lifetime=10, pickup_range=2.0,
+                 merge_range=1.0, max_stack=64, capacity=64, seed=None, clock=None):
+        self.world = world
+        self.draw = draw
+        self.pick_up = pick_up
+        self.collector = collector
+        self.lifetime = lifetime
+        self.pickup_range = pickup_range
+        self.merge_range = merge_range
+        self.max_stack = max_stack
+        self.rng = np.random.default_rng(seed)
+        self.clock = clock
+        self.time = clock() if clock else 0
+        self.last_dt = 0
+        self.cell_size = max(pickup_range, merge_range)
+        self.grid = {}  # cell -> set of resting slots
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """(Re)allocate the arrays for capacity stacks, keeping the current ones."""
+        def grow(name, shape, dtype):
+            array = np.zeros(shape, dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:len(old)] = old
+            setattr(self, name, array)
+
+        grow('positions', (capacity, 3), np.float32)
+        grow('last_positions', (capacity, 3), np.float32)
+        grow('velocities', (capacity, 3), np.float32)
+        grow('types', capacity, np.uint8)
+        grow('counts', capacity, np.int32)
+        grow('expiry', capacity, np.float64)
+        grow('grounded', capacity, bool)
+        grow('alive', capacity, bool)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
+
+    def _cell(self, pos):
+        size = self.cell_size
+        return (math.floor(pos[0] / size), math.floor(pos[1] / size), math.floor(pos[2] / size))
+
+    def _near(self, pos, radius):
+        """Resting slots within radius of pos."""
+        cx, cy, cz = self._cell(pos)
+        found = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    for slot in self.grid.get((cx + dx, cy + dy, cz + dz), ()):
+                        p = self.positions[slot]
+                        if (p[0] - pos[0]) ** 2 + (p[1] - pos[1]) ** 2 + (p[2] - pos[2]) ** 2 <= radius * radius:
+                            found.append(slot)
+        return found
+
+    def drop(self, position, block, count=1):
+        """Throw a new stack up from position."""
+        free = np.flatnonzero(~self.alive)
+        if not len(free):
+            self._allocate(len(self.alive) * 2)
+            free = np.flatnonzero(~self.alive)
+        slot = free[0]
+        self.positions[slot] = position
+        self.last_positions[slot] = position
+        self.velocities[slot] = self.rng.uniform((-0.05, 0.2, -0.05), (0.05, 0.4, 0.05))
+        self.types[slot] = block
+        self.counts[slot] = count
+        self.expiry[slot] = self.time + self.lifetime
+        self.grounded[slot] = False
+        self.alive[slot] = True
+
+    def _remove(self, slot):
+        if self.grounded[slot]:
+            self.grid[self._cell(self.positions[slot])].discard(slot)
+        self.alive[slot] = False
+
+    def _land(self, slot):
+        """A falling stack came to rest: merge it into a neighbour or file it in the grid."""
+        self.grounded[slot] = True
+        self.last_positions[slot] = self.positions[slot]
+        for other in self._near(self.positions[slot], self.merge_range):
+            if self.types[other] != self.types[slot] or self.counts[other] >= self.max_stack:
+                continue
+            moved = min(self.counts[slot], self.max_stack - self.counts[other])
+            self.counts[other] += moved
+            self.counts[slot] -= moved
+            self.expiry[other] = max(self.expiry[other], self.expiry[slot])
+            if not self.counts[slot]:
+                self.alive[slot] = False
+                return
+        self.grid.setdefault(self._cell(self.positions[slot]), set()).add(slot)
+
+    def unsettle(self, pos, radius):
+        """Let resting stacks near pos fall again, e.g. when the block under
+        them is removed. Returns True if any did."""
+        slots = self._near(pos, radius)
+        for slot in slots:
+            self.grid[self._cell(self.positions[slot])].discard(slot)
+            self.grounded[slot] = False
+        return bool(slots)
+
+    def _fall(self, slots, dt):
+        positions = self.positions[slots] + self.velocities[slots] * dt
+        velocities = self.velocities[slots]
+        velocities[:, 1] -= self.gravity * dt
+        # Land on the block below (block y tops out at y), or on the ground
+        half = self.size / 2
+        check_y = np.round(positions[:, 1] - half)
+        below = self.world.blocks_at(np.round(positions[:, 0]).astype(np.int64), check_y.astype(np.int64),
+                                     np.round(positions[:, 2]).astype(np.int64))
+        floor_y = np.where(below != 0, check_y + half, half)
+        hit = positions[:, 1] <= floor_y
+        positions[hit, 1] = floor_y[hit]
+        velocities[hit, 1] *= -self.bounce
+        velocities[hit, 0] *= 0.8
+        velocities[hit, 2] *= 0.8
+        settled = hit & (np.abs(velocities[:, 1]) < 0.1)
+        velocities[settled] = 0
+        self.positions[slots] = positions
+        self.velocities[slots] = velocities
+        for slot in slots[settled]:
+            self._land(slot)
+
+    def _collect(self):
+        center = np.asarray(self.collector(), np.float32)
+        falling = np.flatnonzero(self.alive & ~self.grounded)
+        near = np.sum((self.positions[falling] - center) ** 2, axis=1) <= self.pickup_range ** 2
+        for slot in self._near(center, self.pickup_range) + falling[near].tolist():
+            left = self.pick_up(int(self.types[slot]), int(self.counts[slot]))
+            if left:
+                self.counts[slot] = left
+            else:
+                self._remove(slot)
+
+    def due(self):
+        """Whether tick() has anything to do: a stack falling, expiring or
+        within reach of the collector."""
+        if not self.alive.any():
+            return False
+        now = self.clock() if self.clock else self.time
+        if (self.alive & (~self.grounded | (self.expiry <= now))).any():
+            return True
+        return bool(self._near(self.collector(), self.pickup_range))
+
+    def tick(self, dt):
+        self.time = self.clock() if self.clock else self.time + dt
+        self.last_dt = dt
+        for slot in np.flatnonzero(self.alive & (self.expiry <= self.time)):
+            self._remove(slot)
+        falling = np.flatnonzero(self.alive & ~self.grounded)
+        self.last_positions[falling] = self.positions[falling]
+        if len(falling):
+            self._fall(falling, dt)
+        self._collect()
+        return self.due()
+
+    def interpolate(self, alpha):
+        slots = np.flatnonzero(self.alive)
+        last = self.last_positions[slots]
+        positions = last + (self.positions[slots] - last) * alpha
+        # Every stack spins, each starting at its own angle
+        t = self.time - self.last_dt * (1 - alpha)
+        angles = np.radians(self.spin_speed * t + slots * 37.0)
+        cos, sin = np.cos(angles)[:, None], np.sin(angles)[:, None]
+        corners = CUBE_CORNERS * self.size
+        vertices = np.empty((len(slots), len(corners), 7), np.float32)
+        vertices[:, :, 0] = positions[:, 0, None] + corners[:, 0] * cos - corners[:, 2] * sin
+        vertices[:, :, 1] = positions[:, 1, None] + corners[:, 1]
+        vertices[:, :, 2] = positions[:, 2, None] + corners[:, 0] * sin + corners[:, 2] * cos
+        vertices[:, :, 3:] = BLOCK_RGBA[self.types[slots]][:, None, :]
+        self.draw(vertices.reshape(-1, 7))
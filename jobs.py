@@ -0,0 +1,74 @@
+"""Main-thread job queue drained within a per-frame time budget."""
+
+import heapq
+import itertools
+import time
+
+
+class JobQueue:
+    """Deferred main-thread work, run in priority order a few ms per frame.
+
+    Lower priority numbers run first; equal priorities run in submission
+    order. Jobs given a key are coalesced: submitting a key that is already
+    queued does nothing, so e.g. a chunk is rebuilt once no matter how many
+    of its blocks change in a frame, unless the new submission is more
+    urgent. Then it replaces the queued job, priority and arguments both.
+    """
+
+    def __init__(self, budget=0.004):
+        self.budget = budget  # seconds per frame
+        self.heap = []        # (priority, sequence number, key, job, args)
+        self.keys = {}        # key -> (priority, sequence number) of its live heap entry
+        self.stale = 0        # heap entries replaced by a more urgent submission
+        self.sequence = itertools.count()
+        # Metrics
+        self.last_run_jobs = 0
+        self.last_run_time = 0
+        self.total_jobs = 0
+        self.total_time = 0
+
+    def __len__(self):
+        return len(self.heap) - self.stale
+
+    def submit(self, priority, job, *args, key=None):
+        number = next(self.sequence)
+        if key is not None:
+            queued = self.keys.get(key)
+            if queued is not None:
+                if priority >= queued[0]:
+                    return
+                # Left in the heap, and skipped when it comes up
+                self.stale += 1
+            self.keys[key] = (priority, number)
+        heapq.heappush(self.heap, (priority, number, key, job, args))
+
+    def run(self):
+        """Run jobs until this frame's budget is spent; returns how many ran.
+
+        At least one job runs per call so the queue always makes progress.
+        """
+        return self._run(time.perf_counter() + self.budget)
+
+    def drain(self):
+        """Run every queued job, ignoring the budget."""
+        return self._run(None)
+
+    def _run(self, deadline):
+        start = time.perf_counter()
+        count = 0
+        while self.heap:
+            priority, number, key, job, args = heapq.heappop(self.heap)
+            if key is not None:
+                if self.keys.get(key) != (priority, number):
+                    self.stale -= 1
+                    continue
+                del self.keys[key]
+            job(*args)
+            count += 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        self.last_run_jobs = count
+        self.last_run_time = time.perf_counter() - start
+        self.total_jobs += count
+        self.total_time += self.last_run_time
+        return count
@@ -0,0 +1,167 @@
+"""Level of detail for distant terrain: coarse heightmap tiles around the block chunks.
+
+The ground is covered by a quadtree of square tiles aligned to their
+size, from ROOT_SIZE down to single chunks. A tile is split into four
+while the player is within split_ratio times its size of it, or while it
+holds a chunk drawn with full block detail, so detail falls off with
+distance and tiles never overlap the block chunks. Every tile left unsplit
+is drawn as a heightmap sampled every tile_step(size) columns, and the
+tiles under one root are drawn as one mesh.
+"""
+
+import collections
+import math
+
+import numpy as np
+
+from blocks import BLOCK_RGBA
+from meshing import FACE_TRIANGLES, interleave_mesh
+from terrain import generate_surface
+from world import CHUNK_SIZE
+
+ROOT_SIZE = CHUNK_SIZE * 8  # the biggest tiles, sampled every 8 columns
+TILE_SAMPLES = 16           # samples across a tile, for tiles of 32 blocks and up
+
+
+def tile_step(size):
+    """Columns per heightmap sample of a tile: 2, 4 and 8 for 32, 64 and 128 blocks."""
+    return max(2, size // TILE_SAMPLES)
+
+
+def root_of(tile):
+    """The ROOT_SIZE tile a tile lies in."""
+    return (tile[0] // ROOT_SIZE * ROOT_SIZE, tile[1] // ROOT_SIZE * ROOT_SIZE, ROOT_SIZE)
+
+
+def tile_distance(tile, position):
+    """Horizontal distance from position to the nearest point of a tile."""
+    x0, z0, size = tile
+    # Blocks fill x-0.5..x+0.5 (see meshing.py)
+    dx = max(x0 - 0.5 - position[0], position[0] - (x0 + size - 0.5), 0)
+    dz = max(z0 - 0.5 - position[2], position[2] - (z0 + size - 0.5), 0)
+    return math.sqrt(dx * dx + dz * dz)
+
+
+def lod_tiles(position, detail, view_distance, split_ratio=0.75):
+    """The (x0, z0, size) tiles to draw around position.
+
+    detail is the set of (cx, cz) chunks drawn with full block detail; no
+    tile covers them. Tiles reach out to view_distance.
+    """
+    # Tiles that hold a detail chunk, so they get split
+    holding = set()
+    for cx, cz in detail:
+        size = CHUNK_SIZE * 2
+        while size <= ROOT_SIZE:
+            holding.add((cx * CHUNK_SIZE // size * size, cz * CHUNK_SIZE // size * size, size))
+            size *= 2
+
+    tiles = []
+
+    def visit(tile):
+        x0, z0, size = tile
+        distance = tile_distance(tile, position)
+        if distance > view_distance:
+            return
+        if size == CHUNK_SIZE:
+            if (x0 // CHUNK_SIZE, z0 // CHUNK_SIZE) not in detail:
+                tiles.append(tile)
+            return
+        if tile in holding or distance < size * split_ratio:
+            half = size // 2
+            for dx in (0, half):
+                for dz in (0, half):
+                    visit((x0 + dx, z0 + dz, half))
+        else:
+            tiles.append(tile)
+
+    low_x = math.floor((position[0] - view_distance) / ROOT_SIZE)
+    high_x = math.floor((position[0] + view_distance) / ROOT_SIZE)
+    low_z = math.floor((position[2] - view_distance) / ROOT_SIZE)
+    high_z = math.floor((position[2] + view_distance) / ROOT_SIZE)
+    for rx in range(low_x, high_x + 1):
+        for rz in range(low_z, high_z + 1):
+            visit((rx * ROOT_SIZE, rz * ROOT_SIZE, ROOT_SIZE))
+    return tiles
+
+
+def build_heightmap_mesh(heights, surfaces, origin, step):
+    """Vertex, triangle, colour and uv arrays of one tile's heightmap.
+
+    heights[i, k] is the column height (as in generate_surface) at column
+    origin + (i, k) * step, and surfaces[i, k] its top block's ID, whose
+    colour the sample gets. The samples are joined into one surface at the
+    tops of the columns, two triangles per step x step cell, spanning the
+    tile's blocks edge to edge. Skirts hang from the tile's edges to the
+    bottom of the world and hide the cracks where it meets a tile sampled
+    at another step.
+    """
+    n_x, n_z = heights.shape
+    ix, iz = np.meshgrid(np.arange(n_x), np.arange(n_z), indexing='ij')
+    # Blocks fill x-0.5..x+0.5, and a column of height h has its top face at y = h - 1
+    grid = np.stack((origin[0] - 0.5 + ix * step, heights - 1, origin[1] - 0.5 + iz * step), axis=2).reshape(-1, 3)
+    grid_colors = BLOCK_RGBA[surfaces].reshape(-1, 4)
+    # One repeat of the block texture per cell
+    grid_uvs = np.stack((ix, iz), axis=2).reshape(-1, 2)
+    index = np.arange(n_x * n_z).reshape(n_x, n_z)
+    # Corners in the same order as a block's top face (see meshing.FACES)
+    corners = (index[:-1, :-1], index[1:, :-1], index[1:, 1:], index[:-1, 1:])
+    triangles = [np.stack(corners, axis=-1)[..., FACE_TRIANGLES].ravel()]
+    vertices, colors, uvs = [grid], [grid_colors], [grid_uvs]
+    count = len(grid)
+    # Each edge walked so that its skirt faces out of the tile
+    for edge in (index[:, 0], index[::-1, -1], index[-1, :], index[0, ::-1]):
+        n = len(edge)
+        bottom = grid[edge].copy()
+        bottom[:, 1] = -1
+        vertices.append(bottom)
+        colors.append(grid_colors[edge])
+        uvs.append(np.stack((np.arange(n), np.zeros(n)), axis=1))
+        top, low = edge[:-1], count + np.arange(n - 1)
+        # Corners in the same order as a block's side face: bottom, bottom, top, top
+        triangles.append(np.stack((low, low + 1, edge[1:], top), axis=-1)[..., FACE_TRIANGLES].ravel())
+        count += n
+    return (np.concatenate(vertices).astype(np.float32), np.concatenate(triangles),
+            np.concatenate(colors), np.concatenate(uvs).astype(np.float32))
+
+
+def build_tile_mesh(tile):
+    """A tile's heightmap mesh as VERTEX_FORMAT vertices and triangles."""
+    x0, z0, size = tile
+    step = tile_step(size)
+    heights, surfaces = generate_surface(x0, z0, size, size, step)
+    return interleave_mesh(*build_heightmap_mesh(heights, surfaces, (x0, z0), step))
+
+
+class TileMeshes:
+    """Builds the combined mesh of a root's tiles, for a MeshWorker.
+
+    Tile meshes depend only on the terrain, so the last `capacity` built
+    are kept, and re-tiling a root mostly reuses them. Only ever called
+    from the one worker thread.
+    """
+
+    def __init__(self, capacity=512):
+        self.capacity = capacity
+        self.meshes = collections.OrderedDict()  # tile -> (vertices, triangles)
+
+    def tile(self, tile):
+        mesh = self.meshes.get(tile)
+        if mesh is None:
+            mesh = self.meshes[tile] = build_tile_mesh(tile)
+            if len(self.meshes) > self.capacity:
+                self.meshes.popitem(last=False)
+        else:
+            self.meshes.move_to_end(tile)
+        return mesh
+
+    def build(self, tiles):
+        """One (vertices, triangles) mesh of all the tiles."""
+        vertices, triangles = [], []
+        count = 0
+        for tile in tiles:
+            tile_vertices, tile_triangles = self.tile(tile)
+            vertices.append(tile_vertices)
+            triangles.append(tile_triangles + count)
+            count += len(tile_vertices)
+        return np.concatenate(vertices), np.concatenate(triangles).astype(np.uint32)
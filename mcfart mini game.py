@@ -1,434 +1,415 @@
 from ursina import *
-from ursina.prefabs.first_person_controller import FirstPersonController
-from perlin_noise import PerlinNoise
-import winsound
 import random
+import argparse
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import importlib.machinery
+import numpy as np
+from world import CHUNK_SIZE, BlockIndex, chunk_key
+from meshing import VERTEX_FORMAT, MeshWorker, build_interleaved_chunk_mesh
+from blocks import AIR, BLOCK_IDS, BLOCK_RGBA, BLOCK_TRANSPARENT, BLOCK_TYPES
+from terrain import ChunkGeneratorPool, get_biome, set_seed
+from streaming import ChunkStreamer, chunk_distance_sq
+from culling import tile_bounds, visible_boxes, visible_chunks
+from lod import TileMeshes, lod_tiles, root_of, tile_distance
+from occlusion import camera_cell, reachable_sections, section_connectivity
+from scheduler import TickScheduler
+from jobs import JobQueue
+from particles import ParticleSystem
+from items import DroppedItems
+from inventory import Inventory
+from region import RegionStore, load_world_seed
+from audio import AudioService, NullBackend, default_backend
+from profiler import Profiler
+from physics import PlayerBody
+from replay import InputRecorder, frame_time_percentiles, inventory_hash, load_session, world_hash
 
-app = Ursina()
+# Chunk generator processes only need terrain.py. Spawned children re-run the
+# main script unless its spec says it's __main__, and this one opens a window.
+__spec__ = importlib.machinery.ModuleSpec('__main__', None)
+
+# --record FILE saves this session's input; --replay FILE plays a session back
+# and reports frame times and world/inventory hashes (see replay.py)
+arg_parser = argparse.ArgumentParser(description='McFart mini game')
+arg_parser.add_argument('--record', metavar='FILE', help="record this session's input to FILE")
+arg_parser.add_argument('--replay', metavar='FILE', help='play back a recorded session, then quit')
+arg_parser.add_argument('--headless', action='store_true', help='replay without opening a window')
+arg_parser.add_argument('--report', metavar='FILE', help='also write the replay report to FILE as JSON')
+args, _ = arg_parser.parse_known_args()
+
+app = Ursina(window_type='offscreen' if args.headless else 'onscreen')
+if args.headless:
+    # An offscreen buffer has no pointer to read or grab: the mouse stays in
+    # the middle, and locking it only sets the flag
+    type(mouse).x = type(mouse).y = property(lambda self: 0)
+    type(mouse).locked = property(lambda self: getattr(self, '_locked', False),
+                                  lambda self, value: setattr(self, '_locked', value))
 
 # Configuration
-WORLD_SIZE = 24  # Reduced from 32 for better performance
-MAX_HEIGHT = 8   # Reduced from 10
-RENDER_DISTANCE = 16  # Only render blocks within 16 blocks of player
-pnoise = PerlinNoise()
+SAVE_DIR = os.path.join('saves', 'world')  # Delete this folder to start a new world
+if args.record or args.replay:
+    # Sessions start in a new world, so a replay begins where its recording did
+    SAVE_DIR = tempfile.mkdtemp(prefix='mcfart-session-')
+    atexit.register(shutil.rmtree, SAVE_DIR, True)
+replay_seed, replay_frames = load_session(args.replay) if args.replay else (None, None)
+# A saved world keeps the seed it was made with; new worlds get a random one
+WORLD_SEED = load_world_seed(SAVE_DIR, replay_seed or random.randint(1, 2 ** 31 - 1))
+LOAD_RADIUS = 3    # Chunks generated around the player
+UNLOAD_RADIUS = 4  # Chunks further away than this are dropped
+RENDER_DISTANCE = 48  # Only render chunks within 48 blocks of the player
+LOD_DISTANCE = 256    # Beyond that, coarse heightmaps of the terrain out to here (see lod.py)
+TICK_RATE = 20  # Simulation ticks per second, whatever the frame rate
+JOB_BUDGET_MS = 4  # Time per frame spent on queued meshing and cleanup
+PROFILE_DIR = 'profiles'  # F4 writes Chrome traces of the last few seconds here
+
+# Block IDs of every loaded chunk; the world itself, drawn by the chunk meshes
+block_index = BlockIndex()
+# (cx, cz) -> Entity holding that chunk's combined mesh
+chunk_entities = {}
+# (cx, cz) -> which faces of the chunk's sections see each other, for occlusion culling
+chunk_sections = {}
+# Region files with every chunk the player has changed
+region_store = RegionStore(SAVE_DIR)
+# Loaded chunks edited since they were last saved
+modified_chunks = set()
+# Deferred main-thread work: meshing and entity cleanup, a few ms per frame
+jobs = JobQueue(JOB_BUDGET_MS / 1000)
+PRIORITY_EDIT = 0      # Remeshing chunks the player just changed
+PRIORITY_MESH = 1      # New chunks, nearest first (plus their distance squared)
+PRIORITY_CLEANUP = float('inf')  # Destroying hidden entities, whenever there's time
+
+# Per-subsystem frame timing; F3 shows it, and it costs nothing while hidden
+profiler = Profiler(history=10)
 
-# Store all voxels for culling
-all_voxels = []
+# Sound effects, played on their own thread; silent without an audio device
+audio = AudioService(NullBackend() if args.headless else default_backend(app))
+atexit.register(audio.close)
+
+def destroy_later(entity):
+    """Hide an entity now and destroy it when the job queue has time."""
+    entity.enabled = False
+    jobs.submit(PRIORITY_CLEANUP, destroy, entity)
 
 # 9-slot hotbar palette (Minecraft-like)
 HOTBAR_PALETTE = ['grass','stone','wood','leaves','dirt','sand','cobble','glass','brick','cactus']
 
-# Simple color map for the 9 items
-LEAF_COLOR = color.rgb(0.35, 0.52, 0.3)
-WOOD_COLOR = color.rgb(0.6, 0.4, 0.2)  # Distinct wood color
-CACTUS_COLOR = color.rgb(0.2, 0.6, 0.2)  # Green cactus color
-SAND_COLOR = color.rgb(0.93, 0.87, 0.68)  # Sandy color
-ITEM_COLORS = {
-    'grass': color.green,
-    'stone': color.dark_gray,
-    'wood': WOOD_COLOR,
-    'leaves': LEAF_COLOR,
-    'dirt': color.brown,
-    'sand': SAND_COLOR,
-    'cobble': color.gray,
-    'glass': color.cyan,
-    'brick': color.red,
-    'cactus': CACTUS_COLOR,
-}
+# Item colours come from the block registry (blocks.py), like every other block property
+ITEM_COLORS = {block.name: color.rgb(*block.color) for block in BLOCK_TYPES[1:]}
+
+MAX_STACK_SIZE = 64
 
-# 9 slots holding {type, count}
-hotbar_slots = [{ 'type': None, 'count': 0 } for _ in range(9)]
+# 9 slots of item stacks (see inventory.py)
+hotbar_slots = Inventory(9, MAX_STACK_SIZE)
 selected_slot = 0
 
-MAX_STACK_SIZE = 64
+PARTICLE_CAPACITY = 1024  # Particles alive at once; the oldest are reused past this
+PARTICLES_PER_BLOCK = 12
 
-def add_to_hotbar(item):
-    # add to existing stack (up to max)
-    for s in hotbar_slots:
-        if s['type'] == item and s['count'] < MAX_STACK_SIZE:
-            s['count'] += 1
-            return
-    # add to first empty slot
-    for s in hotbar_slots:
-        if s['type'] is None:
-            s['type'] = item
-            s['count'] = 1
-            return
-
-class BreakingParticle(Entity):
-    def __init__(self, position, color):
-        super().__init__(
-            parent=scene,
-            model='cube',
-            position=position,
-            color=color,
-            scale=0.15
-        )
-        self.velocity = Vec3(
-            random.uniform(-0.1, 0.1),
-            random.uniform(0.1, 0.3),
-            random.uniform(-0.1, 0.1)
-        )
-        self.life = 0.5
-        self.age = 0
-    
-    def update(self):
-        self.age += time.dt
-        self.position += self.velocity * time.dt
-        self.velocity.y -= 0.5 * time.dt  # gravity
-        self.scale *= 0.95
-        if self.age >= self.life:
-            destroy(self)
+# Particles and dropped items are each drawn as one mesh, rebuilt from arrays
+# of interleaved position and colour as they move
+batch_indices = np.arange(0, dtype=np.uint32)
+
+def batch_entity():
+    return Entity(parent=scene, model=Mesh(static=False), enabled=False)
+
+def draw_batch(entity, vertices):
+    global batch_indices
+    entity.enabled = len(vertices) > 0
+    if entity.enabled:
+        # Unindexed triangles straight from the arrays, no per-vertex Python
+        if len(batch_indices) < len(vertices):
+            batch_indices = np.arange(len(vertices) * 2, dtype=np.uint32)
+        mesh = entity.model
+        mesh.vertex_buffer = vertices.tobytes()
+        mesh.vertex_buffer_length = len(vertices)
+        mesh.vertex_buffer_format = 'p3f,c4f'
+        mesh.triangles = batch_indices[:len(vertices)]
+        mesh.generate()
+
+particle_entity = batch_entity()
+particles = ParticleSystem(PARTICLE_CAPACITY, lambda vertices: draw_batch(particle_entity, vertices), seed=WORLD_SEED)
 
 def spawn_breaking_particles(position, color):
-    # Reduced from 8 to 4 particles for better performance
-    for _ in range(4):
-        BreakingParticle(position + Vec3(random.uniform(-0.3, 0.3), random.uniform(-0.3, 0.3), random.uniform(-0.3, 0.3)), color)
+    particles.emit(position, tuple(color), PARTICLES_PER_BLOCK)
+    scheduler.wake(particles)
+
+ITEM_LIFETIME = 10  # Seconds before a dropped item despawns
+PICKUP_RANGE = 2.0  # Items within this many blocks of the player get picked up
+MERGE_RANGE = 1.0   # Items of one type landing this close together become one stack
 
-# List to track dropped items
-dropped_items = []
+# Only particles and items with something to do get ticked; both sleep otherwise
+scheduler = TickScheduler(step=1 / TICK_RATE)
 
 def get_block_at_position(pos):
-    """Check if there's a voxel block at the given position."""
-    check_pos = Vec3(round(pos.x), round(pos.y), round(pos.z))
-    for entity in scene.children:
-        if isinstance(entity, Voxel):
-            entity_pos = Vec3(round(entity.position.x), round(entity.position.y), round(entity.position.z))
-            if entity_pos == check_pos:
-                return entity
-    return None
+    """Block ID at the given position (AIR if there's nothing there)."""
+    return block_index.get(pos)
 
-class ItemEntity(Entity):
-    def __init__(self, position, item_type):
-        super().__init__(
-            parent=scene,
-            model='cube',
-            position=position,
-            color=ITEM_COLORS.get(item_type, color.white),
-            scale=0.25
-        )
-        self.item_type = item_type
-        self.velocity = Vec3(
-            random.uniform(-0.05, 0.05),
-            random.uniform(0.2, 0.4),
-            random.uniform(-0.05, 0.05)
-        )
-        self.bounce = 0.5
-        self.grounded = False
-        self.life = 300  # 5 minutes before despawning (at 60fps)
-        self.picked_up = False
-        dropped_items.append(self)
-    
-    def update(self):
-        if self.picked_up:
-            return
-        
-        # Only update physics every 2nd frame for performance
-        if frame_count % 2 != 0 and self.grounded:
-            # Just rotate if grounded and on even frames
-            self.rotation_y += 90 * time.dt
-            return
-            
-        # Physics
-        if not self.grounded:
-            self.position += self.velocity * time.dt
-            self.velocity.y -= 1.0 * time.dt  # gravity
-            
-            # Check for block collision below
-            check_pos_below = Vec3(self.position.x, self.position.y - 0.125, self.position.z)
-            block_below = get_block_at_position(check_pos_below)
-            
-            if block_below:
-                # Land on top of the block
-                target_y = block_below.position.y + 0.625  # Block height (0.5) + item half-height (0.125)
-                if self.position.y <= target_y:
-                    self.position.y = target_y
-                    self.velocity.y = -self.velocity.y * self.bounce
-                    self.velocity.x *= 0.8
-                    self.velocity.z *= 0.8
-                    if abs(self.velocity.y) < 0.1:
-                        self.grounded = True
-                        self.velocity = Vec3(0, 0, 0)
-            elif self.position.y <= 0.125:
-                # Hit the ground
-                self.position.y = 0.125
-                self.velocity.y = -self.velocity.y * self.bounce
-                self.velocity.x *= 0.8
-                self.velocity.z *= 0.8
-                if abs(self.velocity.y) < 0.1:
-                    self.grounded = True
-                    self.velocity = Vec3(0, 0, 0)
-        
-        # Rotate slowly
-        self.rotation_y += 90 * time.dt
-        
-        # Check for player pickup (only every 5 frames for performance)
-        if frame_count % 5 == 0:
-            try:
-                player_pos = player.position
-                dist = distance(self.position, player_pos)
-                if dist <= 2.0:  # Within 2 blocks
-                    # Try to add to hotbar
-                    added = False
-                    for s in hotbar_slots:
-                        if s['type'] == self.item_type and s['count'] < MAX_STACK_SIZE:
-                            s['count'] += 1
-                            added = True
-                            break
-                    if not added:
-                        for s in hotbar_slots:
-                            if s['type'] is None:
-                                s['type'] = self.item_type
-                                s['count'] = 1
-                                added = True
-                                break
-                    
-                    if added:
-                        self.picked_up = True
-                        destroy(self)
-                        dropped_items.remove(self)
-                        # Pickup sound
-                        try:
-                            winsound.Beep(1200, 30)
-                        except:
-                            pass
-            except:
-                pass
-        
-        # Despawn timer
-        self.life -= 1
-        if self.life <= 0:
-            destroy(self)
-            if self in dropped_items:
-                dropped_items.remove(self)
+def pick_up_items(block, count):
+    """Put picked-up items in the hotbar; returns how many didn't fit."""
+    left = hotbar_slots.add(BLOCK_TYPES[block].name, count)
+    if left < count:
+        audio.tone(1200, 30)  # Pickup sound
+    return left
+
+# Every item on the ground, simulated together
+item_entity = batch_entity()
+dropped_items = DroppedItems(
+    block_index,
+    lambda vertices: draw_batch(item_entity, vertices),
+    pick_up_items,
+    lambda: player.position,
+    lifetime=ITEM_LIFETIME,
+    pickup_range=PICKUP_RANGE,
+    merge_range=MERGE_RANGE,
+    max_stack=MAX_STACK_SIZE,
+    seed=WORLD_SEED,
+    clock=lambda: scheduler.time,
+)
 
 def drop_item(position, item_type):
-    ItemEntity(position, item_type)
+    dropped_items.drop(position, BLOCK_IDS[item_type])
+    scheduler.wake(dropped_items)
 
 def get_held_type(slot_index):
     if 0 <= slot_index < len(hotbar_slots):
-        return hotbar_slots[slot_index]['type']
+        return hotbar_slots[slot_index].type
     return None
 
-class Voxel(Button):
-    def __init__(self, position=(0,0,0), col=color.white):
-        super().__init__(parent=scene, position=position, model='cube', origin_y=0.5, 
-                         texture='white_cube', color=col, highlight_color=color.yellow)
-        self.col = col
-        self.breaking_start_time = None
-        self.is_breaking = False
-        self.is_visible = True
-        # Set hardness based on block type
-        if col == color.green:  # Grass
-            self.hardness = 0.3
-        elif col == WOOD_COLOR:  # Wood (tree trunks)
-            self.hardness = 0.6
-        elif col == color.brown:  # Dirt
-            self.hardness = 0.4
-        elif col == color.dark_gray:  # Stone
-            self.hardness = 1.0
-        elif col == LEAF_COLOR:  # Leaves
-            self.hardness = 0.15
-        else:
-            self.hardness = 0.5
-        all_voxels.append(self)
-    
-    def update_visibility(self, player_pos):
-        """Update visibility based on distance from player."""
-        dist = distance(self.position, player_pos)
-        should_be_visible = dist <= RENDER_DISTANCE
-        if should_be_visible != self.is_visible:
-            self.is_visible = should_be_visible
-            self.enabled = should_be_visible
-    
-    def input(self, key):
-        # Don't allow breaking or placing if crafting UI is open
-        if crafting_open:
-            return
-        if not self.is_visible:
-            return
-        if self.hovered and distance(self.world_position, camera.world_position) <= 7:
-            if key == 'left mouse down':
-                self.breaking_start_time = time.time()
-                self.is_breaking = True
-            if key == 'left mouse up':
-                self.breaking_start_time = None
-                self.is_breaking = False
-                self.scale = 1.0
-            if key == 'right mouse down':
-                global selected_slot
-                held = None
-                if selected_slot < len(hotbar_slots):
-                    held = hotbar_slots[selected_slot]['type']
-                    cnt = hotbar_slots[selected_slot]['count']
-                    if held and cnt > 0:
-                        Voxel(position=self.position + mouse.normal, col=ITEM_COLORS.get(held, color.white))
-                        hotbar_slots[selected_slot]['count'] -= 1
-                        if hotbar_slots[selected_slot]['count'] <= 0:
-                            hotbar_slots[selected_slot]['type'] = None
-                            hotbar_slots[selected_slot]['count'] = 0
-                        try:
-                            winsound.Beep(880, 12)
-                        except:
-                            pass
-    
-    def update(self):
-        if not self.is_visible:
-            return
-        if self.is_breaking and self.breaking_start_time:
-            elapsed = time.time() - self.breaking_start_time
-            progress = elapsed / self.hardness
-            if progress >= 1.0:
-                # Spawn breaking particles
-                spawn_breaking_particles(self.position, self.col)
-                # Drop item on ground instead of adding directly to hotbar
-                if self.col == color.green:
-                    drop_item(self.position, 'grass')
-                elif self.col == color.dark_gray:
-                    drop_item(self.position, 'stone')
-                elif self.col == WOOD_COLOR:
-                    drop_item(self.position, 'wood')
-                elif self.col == color.brown:
-                    drop_item(self.position, 'dirt')
-                elif self.col == LEAF_COLOR:
-                    drop_item(self.position, 'leaves')
-                elif self.col == SAND_COLOR:
-                    drop_item(self.position, 'sand')
-                elif self.col == CACTUS_COLOR:
-                    drop_item(self.position, 'cactus')
-                if self in all_voxels:
-                    all_voxels.remove(self)
-                destroy(self)
-            else:
-                self.scale = 0.8 + (0.2 * (1 - progress))
-        elif not self.is_breaking:
-            self.scale = 1.0
-
-def generate_tree(x, y, z):
-    # Trunk
-    for i in range(3):
-        Voxel(position=(x, y + i, z), col=WOOD_COLOR)
-    # Leaves
-    for lx in range(-1, 2):
-        for lz in range(-1, 2):
-            Voxel(position=(x + lx, y + 3, z + lz), col=LEAF_COLOR)
-
-def generate_cactus(x, y, z):
-    # Cactus trunk
-    height = random.randint(2, 4)
-    for i in range(height):
-        Voxel(position=(x, y + i, z), col=CACTUS_COLOR)
-
-def get_biome(x, z):
-    """Determine biome using Perlin noise for organic distribution."""
-    # Use noise for biome distribution - adjusted scale for more variety
-    biome_noise = pnoise([x * 0.05, z * 0.05])
-    
-    # Adjusted thresholds to ensure all 3 biomes appear
-    if biome_noise < -0.2:
-        return 'plains'
-    elif biome_noise < 0.4:
-        return 'mountains'
+def build_chunk(origin, padded):
+    """A chunk's mesh and its section_connectivity; runs on the mesher's thread."""
+    return (build_interleaved_chunk_mesh(padded, origin, BLOCK_RGBA, BLOCK_TRANSPARENT),
+            section_connectivity(padded[1:-1, 1:-1, 1:-1], BLOCK_TRANSPARENT))
+
+# Chunk meshes are built on a worker thread from snapshots of their blocks
+chunk_mesher = MeshWorker(build_chunk, name='chunk-mesher')
+
+def swap_mesh(entities, key, vertices, triangles):
+    """Replace entities[key]'s mesh with one a MeshWorker finished; an empty one removes it."""
+    entity = entities.get(key)
+    if not len(vertices):
+        if entity:
+            destroy(entity)
+            del entities[key]
+        return
+    # The interleaved arrays go to the GPU as they are, no per-vertex Python
+    mesh = Mesh(vertex_buffer=vertices.tobytes(), vertex_buffer_length=len(vertices),
+                vertex_buffer_format=VERTEX_FORMAT, triangles=triangles)
+    if entity is None:
+        entities[key] = Entity(parent=scene, model=mesh, texture='white_cube')
     else:
-        return 'desert'
+        entity.model = mesh
 
-def get_biome_blend(x, z):
-    """Get blending factor between biomes for smooth transitions."""
-    # Sample multiple points to determine transition
-    center_biome = get_biome(x, z)
-    
-    # Sample nearby points
-    samples = [
-        get_biome(x + 2, z),
-        get_biome(x - 2, z),
-        get_biome(x, z + 2),
-        get_biome(x, z - 2),
-        get_biome(x + 1, z + 1),
-        get_biome(x - 1, z - 1),
-    ]
-    
-    # Check if we're in a transition zone
-    transition_count = sum(1 for s in samples if s != center_biome)
-    blend_factor = transition_count / len(samples)
-    
-    return center_biome, blend_factor
-
-def blend_value(val1, val2, factor):
-    """Blend between two values based on factor (0-1)."""
-    return val1 * (1 - factor) + val2 * factor
-
-def generate_world():
-    for z in range(WORLD_SIZE):
-        for x in range(WORLD_SIZE):
-            biome, blend_factor = get_biome_blend(x, z)
-            noise_val = pnoise([x * 0.1, z * 0.1])
-            
-            # Get properties for current biome
-            if biome == 'plains':
-                base_height = int((noise_val + 1) * 4) + 2
-                tree_chance = 0.01
-                surface_block = color.green
-                underground_block = color.brown
-                secondary_block = color.green  # For blending
-            elif biome == 'mountains':
-                base_height = int((noise_val + 1) * MAX_HEIGHT * 1.5)
-                tree_chance = 0.03
-                surface_block = color.green
-                underground_block = color.dark_gray
-                secondary_block = color.brown  # For blending
-            else:  # desert
-                base_height = int((noise_val + 1) * 3) + 2
-                tree_chance = 0
-                surface_block = SAND_COLOR
-                underground_block = SAND_COLOR
-                secondary_block = SAND_COLOR
-            
-            # If in transition zone, blend with neighboring biome
-            if blend_factor > 0:
-                # Sample neighboring biome properties
-                neighbor_biome = None
-                for dx, dz in [(2, 0), (-2, 0), (0, 2), (0, -2)]:
-                    nb = get_biome(x + dx, z + dz)
-                    if nb != biome:
-                        neighbor_biome = nb
-                        break
-                
-                if neighbor_biome:
-                    # Blend height
-                    if neighbor_biome == 'plains':
-                        neighbor_height = int((noise_val + 1) * 4) + 2
-                    elif neighbor_biome == 'mountains':
-                        neighbor_height = int((noise_val + 1) * MAX_HEIGHT * 1.5)
-                    else:
-                        neighbor_height = int((noise_val + 1) * 3) + 2
-                    
-                    height = int(blend_value(base_height, neighbor_height, blend_factor * 0.7))
-                else:
-                    height = base_height
-            else:
-                height = base_height
-            
-            # Generate blocks
-            for y in range(height):
-                if y == height - 1:
-                    block_color = surface_block
-                elif y > height - 4:
-                    block_color = underground_block
-                else:
-                    block_color = color.dark_gray
-                Voxel(position=(x, y, z), col=block_color)
-            
-            # Biome-specific features with smooth transitions
-            if biome == 'plains' or biome == 'mountains':
-                # Trees in plains and mountains
-                if blend_factor < 0.5 and random.random() < tree_chance and height > 2:
-                    generate_tree(x, height, z)
-            elif biome == 'desert':
-                # Cacti in desert
-                if blend_factor < 0.5 and random.random() < 0.03 and height > 2:
-                    generate_cactus(x, height, z)
-
-generate_world()
+def set_block(pos, block):
+    """Place a block by ID (AIR removes it) and refresh the affected meshes.
+
+    Returns False if pos is outside the loaded world.
+    """
+    if not block_index.set(pos, block):
+        return False
+    modified_chunks.add(chunk_key(round(pos[0]), round(pos[2])))
+    # Items resting on a removed block should fall
+    if dropped_items.unsettle(pos, 1.5):
+        scheduler.wake(dropped_items)
+    # Remeshed before anything else at the end of this frame, once however many blocks changed
+    for chunk in block_index.chunks_touching(pos):
+        # Not just chunks with an entity: one whose mesh was empty may not be any more
+        if chunk in chunk_streamer.loaded:
+            jobs.submit(PRIORITY_EDIT, mesh_chunk, chunk, PRIORITY_EDIT, key=('mesh', chunk))
+    return True
+
+set_seed(WORLD_SEED)
+chunk_generator = ChunkGeneratorPool(WORLD_SEED)
+
+def save_chunk(chunk):
+    """Write a chunk's block array to its region file."""
+    region_store.save(chunk[0], chunk[1], block_index.chunk_blocks(*chunk))
+    modified_chunks.discard(chunk)
+
+def load_chunk_blocks(cx, cz):
+    """A chunk's block array, from its save if it has one; runs on a streaming thread."""
+    blocks = region_store.load(cx, cz)
+    if blocks is None:
+        blocks = chunk_generator.generate(cx, cz)
+    return blocks
+
+# One streaming thread per generator process keeps every core busy
+chunk_streamer = ChunkStreamer(load_chunk_blocks, LOAD_RADIUS, UNLOAD_RADIUS, threads=chunk_generator.workers)
+
+def stop_chunk_workers():
+    # Joins the streaming threads, so none submits to the generator pool after it shuts down
+    chunk_streamer.stop()
+    chunk_mesher.stop()
+    lod_mesher.stop()
+    chunk_generator.shutdown()
+    for chunk in list(modified_chunks):
+        save_chunk(chunk)
+    region_store.close()
+
+atexit.register(stop_chunk_workers)
+# Loaded chunks still waiting for a mesh
+chunks_to_mesh = set()
+
+def side_neighbours(chunk):
+    cx, cz = chunk
+    return ((cx + 1, cz), (cx - 1, cz), (cx, cz + 1), (cx, cz - 1))
+
+def chunk_meshable(chunk):
+    # Border faces can only be culled once all four neighbours have their blocks
+    return chunk in chunk_streamer.loaded and all(n in chunk_streamer.loaded for n in side_neighbours(chunk))
+
+def add_loaded_chunks(loaded):
+    for chunk, blocks in loaded:
+        block_index.add_chunk(chunk[0], chunk[1], blocks)
+        chunks_to_mesh.add(chunk)
+        chunks_to_mesh.update(n for n in side_neighbours(chunk) if n in chunk_streamer.loaded)
+
+def drop_unloaded_chunks(unloaded):
+    for chunk in unloaded:
+        if chunk in modified_chunks:
+            save_chunk(chunk)
+        block_index.remove_chunk(*chunk)
+        chunks_to_mesh.discard(chunk)
+        if chunk_sections.pop(chunk, None) is not None:
+            forget_occlusion()
+        # Neighbours lose the blocks their border faces were culled against
+        for c in (chunk,) + side_neighbours(chunk):
+            chunk_mesher.cancel(c)
+            if c in chunk_entities:
+                destroy_later(chunk_entities.pop(c))
+                if c != chunk:
+                    chunks_to_mesh.add(c)
+
+def queue_ready_chunks(center):
+    """Queue a mesh job for every chunk whose neighbours have all loaded."""
+    for chunk in [c for c in chunks_to_mesh if chunk_meshable(c)]:
+        chunks_to_mesh.discard(chunk)
+        priority = PRIORITY_MESH + chunk_distance_sq(chunk, center)
+        jobs.submit(priority, mesh_chunk, chunk, priority, key=('mesh', chunk))
+
+def mesh_chunk(chunk, priority):
+    """Job: hand the mesher a snapshot of a chunk's blocks, if it can still be built."""
+    if chunk_meshable(chunk):
+        chunk_mesher.request(chunk, priority, (chunk[0] * CHUNK_SIZE, chunk[1] * CHUNK_SIZE), block_index.padded_chunk(*chunk))
+    elif chunk in chunk_streamer.loaded:
+        # A neighbour unloaded while this waited in the queue
+        chunks_to_mesh.add(chunk)
+
+def swap_finished_meshes(wait=False):
+    """Swap in the chunk meshes the mesher has finished, each in one go."""
+    for chunk, ((vertices, triangles), sections) in chunk_mesher.finished(wait):
+        if chunk_meshable(chunk):
+            swap_mesh(chunk_entities, chunk, vertices, triangles)
+            # Edits get here too, as every edited chunk is remeshed
+            chunk_sections[chunk] = sections
+            forget_occlusion()
+
+def stream_world():
+    """Bring in chunks generated in the background and drop far ones."""
+    center = chunk_key(round(player.x), round(player.z))
+    # Replays wait for every chunk, so what's loaded never depends on timing
+    loaded, unloaded = chunk_streamer.update(center, wait=replay_frames is not None)
+    drop_unloaded_chunks(unloaded)
+    add_loaded_chunks(loaded)
+    # Meshing runs from the job queue, so the frame time stays flat while the world streams in
+    queue_ready_chunks(center)
+
+# Chunks the camera can see into, from the section walk (see occlusion.py);
+# walked again when the camera moves to another block or a chunk's sections change
+occlusion_state = None   # camera's block the walk was made from
+occlusion_chunks = None  # None when the camera's chunk has no sections yet
+
+def forget_occlusion():
+    global occlusion_state
+    occlusion_state = None
+
+def reachable_chunks():
+    global occlusion_state, occlusion_chunks
+    cell = camera_cell(camera.world_position)
+    if cell != occlusion_state:
+        occlusion_state = cell
+        sections = reachable_sections(cell, chunk_sections)
+        occlusion_chunks = None if sections is None else {(cx, cz) for cx, _, cz in sections}
+    return occlusion_chunks
+
+def cull_chunks():
+    """Show only the chunks within RENDER_DISTANCE that are inside the camera's
+    view and not closed off from it, and the terrain tiles within LOD_DISTANCE
+    that are inside the camera's view."""
+    # A little wider than the lens so chunks don't pop in while turning
+    fov_h, fov_v = camera.perspective_lens.get_fov()
+    fov = (fov_h + 10, fov_v + 10)
+    if chunk_entities:
+        chunks = list(chunk_entities)
+        visible = visible_chunks(chunks, camera.world_position, camera.forward, camera.right, camera.up, fov, RENDER_DISTANCE)
+        reachable = reachable_chunks()
+        if reachable is not None:
+            visible &= np.array([chunk in reachable for chunk in chunks])
+        for chunk, show in zip(chunks, visible.tolist()):
+            entity = chunk_entities[chunk]
+            if entity.visible != show:
+                entity.visible = show
+    if lod_entities:
+        roots = list(lod_entities)
+        visible = visible_boxes(*tile_bounds(roots), camera.world_position, camera.forward, camera.right, camera.up, fov, LOD_DISTANCE)
+        for root, show in zip(roots, visible.tolist()):
+            entity = lod_entities[root]
+            if entity.visible != show:
+                entity.visible = show
+
+# --- Distant terrain ---
+# Past RENDER_DISTANCE the ground is drawn from heightmaps of the terrain noise,
+# coarser further out, one mesh per root tile, built on their own worker thread
+lod_entities = {}  # root tile -> Entity drawing every tile under it
+lod_tiling = {}    # root tile -> the tiles its mesh was last requested with
+lod_state = None   # (player's chunk, detail chunks) the tiling was made for
+lod_mesher = MeshWorker(TileMeshes().build, name='lod-mesher')
+
+def detail_chunks():
+    """Chunks drawn with full block detail: meshed and within RENDER_DISTANCE."""
+    position = camera.world_position
+    return frozenset(chunk for chunk in chunk_entities
+                     if tile_distance((chunk[0] * CHUNK_SIZE, chunk[1] * CHUNK_SIZE, CHUNK_SIZE), position) <= RENDER_DISTANCE)
+
+def update_lod():
+    """Re-tile the distant terrain once the player changes chunk or full-detail
+    chunks come and go, requesting meshes only for roots whose tiles changed."""
+    global lod_state
+    detail = detail_chunks()
+    state = (chunk_key(round(player.x), round(player.z)), detail)
+    if state == lod_state:
+        return
+    lod_state = state
+    tiling = {}
+    for tile in lod_tiles(camera.world_position, detail, LOD_DISTANCE):
+        tiling.setdefault(root_of(tile), []).append(tile)
+    for root, tiles in tiling.items():
+        if lod_tiling.get(root) != tiles:
+            lod_tiling[root] = tiles
+            lod_mesher.request(root, tile_distance(root, camera.world_position), tiles)
+    for root in [root for root in lod_tiling if root not in tiling]:
+        del lod_tiling[root]
+        lod_mesher.cancel(root)
+        if root in lod_entities:
+            destroy_later(lod_entities.pop(root))
+
+def swap_finished_lod(wait=False):
+    for root, (vertices, triangles) in lod_mesher.finished(wait):
+        swap_mesh(lod_entities, root, vertices, triangles)
+
+# Build the ground around spawn before the first frame
+add_loaded_chunks(chunk_streamer.preload((0, 0), 2))
+queue_ready_chunks((0, 0))
+jobs.drain()
+swap_finished_meshes(wait=True)
+
+def set_text(text_entity, text):
+    """Change a Text only if it says something else; every change rebuilds its glyphs."""
+    if getattr(text_entity, 'raw_text', '') != text:
+        text_entity.text = text
 
 # Biome display
 biome_text = Text(
@@ -440,10 +421,71 @@ biome_text = Text(
     color=color.white,
     z=0.5,
 )
+BIOME_NAMES = {
+    'plains': 'Plains',
+    'mountains': 'Mountains',
+    'desert': 'Desert'
+}
+biome_column = None  # (x, z) the biome text was last looked up for
+
+def update_biome_text():
+    """Show the biome under the player, looked up again only when they change column."""
+    global biome_column
+    column = (int(player.position.x), int(player.position.z))
+    if column != biome_column:
+        biome_column = column
+        set_text(biome_text, f'Biome: {BIOME_NAMES.get(get_biome(*column), "Unknown")}')
+
+PLAYER_HEIGHT = 2  # As tall and jumping as high as the old FirstPersonController
+EYE_HEIGHT = 1.9   # Inside the box, so the camera never enters the block overhead
+JUMP_HEIGHT = 2
+STEP_HEIGHT = 1  # Walk up one-block rises without jumping
+
+class Player(Entity):
+    """First-person player: mouse look, WASD to walk, space to jump.
+
+    Collides with the block grid through a PlayerBody (physics.py) instead of
+    raycasting against colliders, so chunk meshes don't need any.
+    """
+
+    def __init__(self, position):
+        self.cursor = Entity(parent=camera.ui, model='quad', color=color.pink, scale=.008, rotation_z=45)
+        super().__init__(position=position)
+        self.body = PlayerBody(block_index, position, height=PLAYER_HEIGHT, eye_height=EYE_HEIGHT,
+                               jump_height=JUMP_HEIGHT, step_height=STEP_HEIGHT)
+        self.camera_pivot = Entity(parent=self, y=self.body.eye_height)
+        camera.parent = self.camera_pivot
+        camera.position = (0, 0, 0)
+        camera.rotation = (0, 0, 0)
+        camera.fov = 90
+        mouse.locked = True
+        self.mouse_sensitivity = Vec2(40, 40)
+        self.speed = 5
+
+    def update(self):
+        with profiler.zone('player'):
+            self.rotation_y += mouse.velocity[0] * self.mouse_sensitivity[1]
+            self.camera_pivot.rotation_x = clamp(self.camera_pivot.rotation_x - mouse.velocity[1] * self.mouse_sensitivity[0], -90, 90)
+            direction = Vec3(self.forward * (held_keys['w'] - held_keys['s'])
+                             + self.right * (held_keys['d'] - held_keys['a'])).normalized()
+            walk = direction * self.speed * time.dt
+            self.body.move(walk.x, walk.z, held_keys['space'], time.dt)
+            self.position = Vec3(*self.body.position)
+
+    def on_enable(self):
+        self.cursor.enabled = True
+        # Back behind the eyes, in case the camera was moved while disabled
+        if hasattr(self, '_camera_transform'):
+            camera.parent = self.camera_pivot
+            camera.transform = self._camera_transform
 
-player = FirstPersonController()
+    def on_disable(self):
+        self.cursor.enabled = False
+        self._camera_transform = camera.transform
+        camera.world_parent = scene
+
+player = Player((0, block_index.column_top(0, 0) + 1, 0))
 player.cursor.visible = True
-player.speed = 5
 player.sprint_speed = 10
 player.normal_speed = 5
 player.is_sprinting = False
@@ -477,6 +519,102 @@ reach_indicator = Text(
     z=0.5,
 )
 
+# Tint drawn over the targeted block, since a chunk mesh can't highlight one block
+block_highlight = Entity(
+    parent=scene,
+    model='cube',
+    texture='white_cube',
+    origin_y=0.5,
+    scale=1.01,
+    color=color.rgba(1, 1, 0, 0.4),
+    enabled=False,
+)
+
+REACH = 7  # Max distance in blocks for breaking and placing
+
+# Block currently being mined, and how far along it is (0 to 1)
+breaking_block = None
+breaking_progress = 0
+
+# Targeting walks the block grid from the camera, so the mouse doesn't need to
+# raycast the scene every frame
+mouse.traverse_target = None
+
+def get_targeted_block():
+    """Return ((x, y, z), face normal, distance) of the block under the crosshair within reach."""
+    return block_index.raycast(camera.world_position, camera.forward, REACH)
+
+shown_target = None  # Block the crosshair and highlight currently show
+
+def show_target(target):
+    """Point the crosshair and highlight at target's block, if it changed."""
+    global shown_target
+    block = target[0] if target else None
+    if block == shown_target:
+        return
+    if (block is None) != (shown_target is None):
+        crosshair_h.color = crosshair_v.color = color.white if block is None else color.green
+        block_highlight.enabled = block is not None
+    if block is not None:
+        block_highlight.position = Vec3(*block) + Vec3(0, 0.005, 0)
+    shown_target = block
+
+def start_breaking(pos):
+    global breaking_block, breaking_progress
+    breaking_block = pos
+    breaking_progress = 0
+
+def stop_breaking():
+    global breaking_block, breaking_progress
+    breaking_block = None
+    breaking_progress = 0
+    block_highlight.color = color.rgba(1, 1, 0, 0.4)
+
+def update_breaking(target, dt):
+    """Advance mining by dt seconds of simulation time."""
+    global breaking_progress
+    if breaking_block is None:
+        return
+    # Looking away from the block cancels mining it
+    if target is None or target[0] != breaking_block:
+        stop_breaking()
+        return
+    block = BLOCK_TYPES[block_index.get(breaking_block)]
+    breaking_progress += dt / block.hardness
+    progress = breaking_progress
+    if progress >= 1.0:
+        position = Vec3(*breaking_block)
+        spawn_breaking_particles(position, ITEM_COLORS[block.name])
+        # Drop item on ground instead of adding directly to hotbar
+        if block.drop:
+            drop_item(position, block.drop)
+        set_block(breaking_block, AIR)
+        stop_breaking()
+    else:
+        block_highlight.color = color.rgba(1, 1 - progress, 0, 0.4 + 0.4 * progress)
+
+def place_block(target):
+    pos, normal, _ = target
+    if selected_slot >= len(hotbar_slots):
+        return
+    held = hotbar_slots[selected_slot].type
+    cnt = hotbar_slots[selected_slot].count
+    new_pos = (pos[0] + normal[0], pos[1] + normal[1], pos[2] + normal[2])
+    # Don't stack a second block into an occupied cell, build inside the player, or outside the world
+    if (held and cnt > 0 and get_block_at_position(new_pos) == AIR and not player.body.overlaps(*new_pos)
+            and set_block(new_pos, BLOCK_IDS[held])):
+        hotbar_slots.take(selected_slot)
+        audio.tone(880, 12)
+
+def handle_block_input(key):
+    target = get_targeted_block()
+    if key == 'left mouse down' and target:
+        start_breaking(target[0])
+    if key == 'left mouse up':
+        stop_breaking()
+    if key == 'right mouse down' and target:
+        place_block(target)
+
 # --- Hotbar UI ---
 HOTBAR_COLOR = color.rgb(0.12, 0.12, 0.12)
 hotbar = Panel(
@@ -486,17 +624,18 @@ hotbar = Panel(
     color=HOTBAR_COLOR,
 )
 
-# 8 dividers for 9 slots
+# 8 dividers for 9 slots, drawn as one mesh since they never change
+hotbar_dividers = Entity(parent=hotbar, z=-0.01)
 for i in range(1, 9):
     x_pos = -0.5 + i/9
     Entity(
-        parent=hotbar,
+        parent=hotbar_dividers,
         model='quad',
         scale=(0.015, 1.0),
         position=(x_pos, 0),
         color=color.rgb(0.2, 0.2, 0.2),
-        z=-0.01
     )
+hotbar_dividers.combine()
 
 # Slot centers
 SLOT_SCREEN_X = [-0.5 + (i + 0.5) / 9 for i in range(9)]
@@ -563,57 +702,77 @@ sprint_text = Text(
     z=0.5,
 )
 
-# Selection borders
-selection_borders = []
-for i in range(9):
-    x_pos = -0.5 + (i + 0.5) / 9
-    top = Entity(parent=hotbar, model='quad', scale=(0.10, 0.02), position=(x_pos, 0.35), color=color.white, z=-0.03)
-    bottom = Entity(parent=hotbar, model='quad', scale=(0.10, 0.02), position=(x_pos, -0.35), color=color.white, z=-0.03)
-    left = Entity(parent=hotbar, model='quad', scale=(0.02, 0.72), position=(x_pos - 0.045, 0), color=color.white, z=-0.03)
-    right = Entity(parent=hotbar, model='quad', scale=(0.02, 0.72), position=(x_pos + 0.045, 0), color=color.white, z=-0.03)
-    for seg in (top, bottom, left, right):
-        seg.enabled = False
-    selection_borders.append([top, bottom, left, right])
-
-def update_selection_border():
-    for idx, segments in enumerate(selection_borders):
-        if idx < len(hotbar_slots):
-            s = hotbar_slots[idx]
-            has_item = (s.get('type') is not None) and (s.get('count', 0) > 0)
-            enabled = (idx == selected_slot) and has_item
-        else:
-            enabled = False
-        for seg in segments:
-            seg.enabled = enabled
-
-def update_hotbar_slots():
-    for i, icon in enumerate(hotbar_slot_icons):
-        if i < len(hotbar_slots):
-            s = hotbar_slots[i]
-            if s.get('type') is not None:
-                icon.enabled = True
-                icon.color = ITEM_COLORS.get(s['type'], color.white)
-                count = s.get('count', 0)
-                if count > 0:
-                    icon.count_text.enabled = True
-                    icon.count_text.text = str(count)
-                else:
-                    icon.count_text.enabled = False
-                    icon.count_text.text = ''
-            else:
-                icon.enabled = False
-                icon.count_text.enabled = False
-                icon.count_text.text = ''
-    update_selection_border()
-    
-    # Update holding text
-    global selected_slot
-    held = 'None'
-    if selected_slot < len(hotbar_slots):
-        t = hotbar_slots[selected_slot].get('type')
-        if t:
-            held = t.capitalize()
-    holding_text.text = f'Holding: {held}'
+# Selection border, moved to the selected slot
+selection_border = Entity(parent=hotbar, z=-0.03)
+for scale, position in (((0.10, 0.02), (0, 0.35)), ((0.10, 0.02), (0, -0.35)),
+                        ((0.02, 0.72), (-0.045, 0)), ((0.02, 0.72), (0.045, 0))):
+    Entity(parent=selection_border, model='quad', scale=scale, position=position, color=color.white)
+selection_border.combine()
+
+def refresh_selection():
+    """Move the selection border to the selected slot and update the holding text."""
+    s = hotbar_slots[selected_slot]
+    selection_border.x = -0.5 + (selected_slot + 0.5) / 9
+    selection_border.visible = s.type is not None and s.count > 0
+    set_text(holding_text, f'Holding: {s.type.capitalize() if s.type else "None"}')
+
+def refresh_hotbar_slots(indices):
+    """Redraw the hotbar slots that changed; hotbar_slots calls this on every change."""
+    for i in indices:
+        s = hotbar_slots[i]
+        icon = hotbar_slot_icons[i]
+        icon.enabled = s.type is not None
+        if s.type is not None:
+            icon.color = ITEM_COLORS.get(s.type, color.white)
+        count = str(s.count) if s.count > 0 else ''
+        icon.count_text.enabled = bool(count)
+        set_text(icon.count_text, count)
+    if selected_slot in indices:
+        refresh_selection()
+
+hotbar_slots.subscribe(refresh_hotbar_slots)
+refresh_hotbar_slots(range(len(hotbar_slots)))
+
+# Profiler overlay (F3), redrawn a few times a second
+PROFILER_REFRESH = 0.25
+profiler_text = Text(
+    parent=camera.ui,
+    text='',
+    position=window.top_left + Vec2(0.02, -0.02),
+    origin=(-0.5, 0.5),
+    scale=1,
+    color=color.white,
+    z=0.5,
+    enabled=False,
+)
+profiler_refresh = 0
+
+def toggle_profiler():
+    profiler.set_enabled(not profiler.enabled)
+    profiler_text.enabled = profiler.enabled
+
+def update_profiler_overlay():
+    global profiler_refresh
+    profiler_refresh -= time.dt
+    if profiler_refresh > 0:
+        return
+    profiler_refresh = PROFILER_REFRESH
+    lines = [f'{name}: {ms:.2f} ms' for name, ms in profiler.averages()]
+    lines += [
+        '',
+        f'Voxels: {sum(np.count_nonzero(blocks) for blocks in block_index.chunks.values())}',
+        f'Chunks: {len(chunk_entities)}',
+        f'Items: {len(dropped_items)}',
+        f'Particles: {len(particles)}',
+        f'Jobs: {len(jobs)}',
+    ]
+    set_text(profiler_text, '\n'.join(lines))
+
+def write_profile():
+    """Save the last few seconds of profiler zones as a Chrome trace."""
+    path = os.path.join(PROFILE_DIR, time.strftime('trace-%Y%m%d-%H%M%S.json'))
+    events = profiler.write_trace(path)
+    print(f'Wrote {events} trace events to {path}')
 
 # --- Crafting System ---
 crafting_open = False
@@ -717,13 +876,22 @@ crafting_entities.append(crafting_title)
 
 def input(key):
     global selected_slot, dragged_item, dragged_item_visual
+    if recorder:
+        recorder.key(key)
     if key == 'f11':
         window.fullscreen = not window.fullscreen
+    if key == 'f3':
+        toggle_profiler()
+    if key == 'f4' and profiler.enabled:
+        write_profile()
     if key in [str(i) for i in range(1,10)]:
         selected_slot = int(key) - 1
-        update_selection_border()
+        refresh_selection()
     if key == 'c':
         toggle_crafting()
+    # Don't allow breaking or placing if crafting UI is open
+    if not crafting_open:
+        handle_block_input(key)
     
     # Handle mouse clicks for crafting drag and drop
     if crafting_open:
@@ -737,15 +905,15 @@ def input(key):
                     # Check if mouse is within slot bounds (approximate)
                     if abs(mouse_pos.x - slot_screen_x) < 0.05 and abs(mouse_pos.y - slot_screen_y) < 0.06:
                         s = hotbar_slots[i]
-                        if s['type'] is not None and s['count'] > 0:
+                        if s.type is not None and s.count > 0:
                             # Start dragging
-                            dragged_item = {'type': s['type'], 'from_hotbar': True, 'slot': i}
+                            dragged_item = {'type': s.type, 'from_hotbar': True, 'slot': i}
                             dragged_item_visual = Entity(
                                 parent=camera.ui,
                                 model='quad',
                                 scale=(0.06, 0.06),
                                 position=mouse_pos,
-                                color=ITEM_COLORS.get(s['type'], color.white),
+                                color=ITEM_COLORS.get(s.type, color.white),
                                 z=1
                             )
                             break
@@ -767,9 +935,7 @@ def input(key):
                             crafting_grid[row][col] = dragged_item['type']
                             # Remove from hotbar
                             if dragged_item['from_hotbar']:
-                                hotbar_slots[dragged_item['slot']]['count'] -= 1
-                                if hotbar_slots[dragged_item['slot']]['count'] <= 0:
-                                    hotbar_slots[dragged_item['slot']]['type'] = None
+                                hotbar_slots.take(dragged_item['slot'])
                             # Update visual
                             crafting_slot_visuals[idx].color = ITEM_COLORS.get(dragged_item['type'], color.white)
                             crafting_slot_visuals[idx].enabled = True
@@ -781,13 +947,80 @@ def input(key):
                     dragged_item_visual = None
                 dragged_item = None
 
-# Frame counter for optimization
-frame_count = 0
-last_cull_frame = 0
+# --- Recording and replay ---
+recorder = None
+if args.record:
+    recorder = InputRecorder(WORLD_SEED)
+    atexit.register(lambda: recorder.save(args.record))
+
+replay_frame = 0
+replay_frame_times = []
+replay_last_frame = None
+
+def play_back_frame():
+    """Feed the next recorded frame's input to the game; False once the session is over."""
+    global replay_frame, replay_last_frame
+    now = time.perf_counter()
+    if replay_last_frame is not None:
+        replay_frame_times.append(now - replay_last_frame)
+    replay_last_frame = now
+    if replay_frame == len(replay_frames):
+        finish_replay()
+        return False
+    frame = replay_frames[replay_frame]
+    replay_frame += 1
+    # The recorded dt, not the wall clock's; everything after this in the frame uses it
+    time.dt = frame['dt']
+    for key in frame['keys']:
+        app.input(key, is_raw=True)
+    held_keys.clear()
+    for key in frame['held']:
+        held_keys[key] = 1
+    mouse.velocity = Vec3(frame['mouse'][0], frame['mouse'][1], 0)
+    return True
+
+def finish_replay():
+    """Report frame times, what's in the world and the end state's hashes, then quit."""
+    report = {
+        'session': args.replay,
+        'frames': len(replay_frames),
+        **frame_time_percentiles(replay_frame_times),
+        'chunks': len(block_index.chunks),
+        'voxels': int(sum(np.count_nonzero(blocks) for blocks in block_index.chunks.values())),
+        'items': len(dropped_items),
+        'particles': len(particles),
+        'entities': len(scene.entities),
+        'player_position': [round(v, 3) for v in player.position],
+        'world_hash': world_hash(block_index),
+        'inventory_hash': inventory_hash(hotbar_slots),
+    }
+    print(json.dumps(report, indent=2))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    # Tearing the engine down aborts the process, so close everything here
+    # and leave directly, and the exit status tells a finished replay apart
+    stop_chunk_workers()
+    audio.close()
+    shutil.rmtree(SAVE_DIR, True)
+    sys.stdout.flush()
+    os._exit(0)
 
 def update():
-    global frame_count, last_cull_frame
-    frame_count += 1
+    if replay_frames is not None and not play_back_frame():
+        return
+    if recorder:
+        recorder.frame(time.dt, [key for key, held in held_keys.items() if held], mouse.velocity)
+    profiler.next_frame()
+    with profiler.zone('streaming'):
+        stream_world()
+    with profiler.zone('culling'):
+        cull_chunks()
+    with profiler.zone('simulation'):
+        # Resting items sleep until the player comes near them or one is due to despawn
+        if dropped_items not in scheduler.active and dropped_items.due():
+            scheduler.wake(dropped_items)
+        ticks = scheduler.advance(time.dt)
     
     # Sprinting mechanics
     if held_keys['shift']:
@@ -801,62 +1034,32 @@ def update():
             player.is_sprinting = False
             sprint_text.text = ''
     
-    # Update visibility culling every 10 frames (performance optimization)
-    if frame_count - last_cull_frame >= 10:
-        last_cull_frame = frame_count
-        try:
-            player_pos = player.position
-            # Only update visibility for a batch of blocks each frame
-            batch_size = 100
-            start_idx = (frame_count // 10 * batch_size) % len(all_voxels)
-            end_idx = min(start_idx + batch_size, len(all_voxels))
-            for voxel in all_voxels[start_idx:end_idx]:
-                if voxel and not voxel.picked_up:
-                    voxel.update_visibility(player_pos)
-        except:
-            pass
-    
-    # Update crosshair and reach indicator (optimized - only check visible blocks)
-    try:
-        hovered_block = None
-        # Only check visible voxels near player
-        for voxel in all_voxels:
-            if voxel and voxel.is_visible and hasattr(voxel, 'hovered') and voxel.hovered:
-                dist = distance(voxel.world_position, camera.world_position)
-                if dist <= 7:
-                    hovered_block = voxel
-                    break
-        
-        if hovered_block:
-            crosshair_h.color = color.green
-            crosshair_v.color = color.green
-            reach_indicator.text = ''
-        else:
-            crosshair_h.color = color.white
-            crosshair_v.color = color.white
-            reach_indicator.text = ''
-    except:
-        pass
+    # Update crosshair, highlight and mining for the block under the crosshair
+    with profiler.zone('targeting'):
+        target = None if crafting_open else get_targeted_block()
+    with profiler.zone('mining'):
+        update_breaking(target, ticks * scheduler.step)
+    with profiler.zone('hud'):
+        show_target(target)
+        update_biome_text()
+        if profiler.enabled:
+            update_profiler_overlay()
     
     # Update dragged item position to follow mouse
     global dragged_item_visual
     if dragged_item_visual:
         dragged_item_visual.position = mouse.position
     
-    # Update biome display
-    try:
-        player_x = int(player.position.x)
-        player_z = int(player.position.z)
-        current_biome = get_biome(player_x, player_z)
-        biome_names = {
-            'plains': 'Plains',
-            'mountains': 'Mountains', 
-            'desert': 'Desert'
-        }
-        biome_text.text = f'Biome: {biome_names.get(current_biome, "Unknown")}'
-    except:
-        pass
-    
-    update_hotbar_slots()
+    # Deferred meshing requests and cleanup, within this frame's budget
+    with profiler.zone('jobs'):
+        if replay_frames is None:
+            jobs.run()
+        else:
+            jobs.drain()  # so the meshes don't depend on timing
+    with profiler.zone('meshing'):
+        swap_finished_meshes(wait=replay_frames is not None)
+    with profiler.zone('lod'):
+        update_lod()
+        swap_finished_lod(wait=replay_frames is not None)
 
 app.run()
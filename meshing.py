@@ -0,0 +1,163 @@
+"""Combined chunk meshes with hidden-face culling, built with NumPy."""
+
+import itertools
+import queue
+import sys
+import threading
+import traceback
+
+import numpy as np
+
+# A block at grid (x, y, z) fills x-0.5..x+0.5, y-1..y, z-0.5..z+0.5, the same
+# box the old per-block cube covered with origin_y=0.5.
+# Each face: (neighbour offset, four corners counter-clockwise seen from outside)
+FACES = (
+    ((1, 0, 0), ((0.5, -1, -0.5), (0.5, -1, 0.5), (0.5, 0, 0.5), (0.5, 0, -0.5))),
+    ((-1, 0, 0), ((-0.5, -1, 0.5), (-0.5, -1, -0.5), (-0.5, 0, -0.5), (-0.5, 0, 0.5))),
+    ((0, 1, 0), ((-0.5, 0, -0.5), (0.5, 0, -0.5), (0.5, 0, 0.5), (-0.5, 0, 0.5))),
+    ((0, -1, 0), ((-0.5, -1, 0.5), (0.5, -1, 0.5), (0.5, -1, -0.5), (-0.5, -1, -0.5))),
+    ((0, 0, 1), ((0.5, -1, 0.5), (-0.5, -1, 0.5), (-0.5, 0, 0.5), (0.5, 0, 0.5))),
+    ((0, 0, -1), ((-0.5, -1, -0.5), (0.5, -1, -0.5), (0.5, 0, -0.5), (-0.5, 0, -0.5))),
+)
+FACE_UVS = np.array(((0, 0), (1, 0), (1, 1), (0, 1)), dtype=np.float32)
+FACE_TRIANGLES = np.array((0, 1, 2, 2, 3, 0))
+
+
+def build_chunk_mesh(padded, origin, colors, transparent):
+    """Build vertex, triangle, colour and uv arrays for one chunk.
+
+    padded is the chunk's block-ID array [x, z, y] with a one-block border
+    of its neighbours (BlockIndex.padded_chunk), so faces on the chunk
+    border are culled against the neighbouring chunk too. origin is the
+    world (x, z) of the chunk's corner. colors (RGBA) and transparent are
+    lookup tables indexed by block ID; air must count as transparent.
+
+    A face is drawn when it borders a transparent block of another type.
+    """
+    inner = padded[1:-1, 1:-1, 1:-1]
+    nx, nz, ny = padded.shape
+    vertices = []
+    vertex_colors = []
+    for (dx, dy, dz), corners in FACES:
+        neighbour = padded[1 + dx:nx - 1 + dx, 1 + dz:nz - 1 + dz, 1 + dy:ny - 1 + dy]
+        visible = (inner != 0) & transparent[neighbour] & (neighbour != inner)
+        xs, zs, ys = np.nonzero(visible)
+        positions = np.stack((xs + origin[0], ys, zs + origin[1]), axis=1).astype(np.float32)
+        vertices.append((positions[:, None, :] + np.array(corners, dtype=np.float32)).reshape(-1, 3))
+        vertex_colors.append(np.repeat(colors[inner[xs, zs, ys]], 4, axis=0))
+    vertices = np.concatenate(vertices)
+    faces = len(vertices) // 4
+    triangles = (np.arange(faces)[:, None] * 4 + FACE_TRIANGLES).ravel()
+    uvs = np.tile(FACE_UVS, (faces, 1))
+    return vertices, triangles, np.concatenate(vertex_colors), uvs
+
+
+# Layout of the interleaved vertex arrays MeshWorker hands back: position, RGBA, uv
+VERTEX_FORMAT = 'p3f,c4f,t2f'
+
+
+def interleave_mesh(vertices, triangles, colors, uvs):
+    """build_chunk_mesh()'s arrays as one VERTEX_FORMAT float32 array and uint32 triangles."""
+    return (np.concatenate((vertices, colors, uvs), axis=1).astype(np.float32),
+            triangles.astype(np.uint32))
+
+
+def build_interleaved_chunk_mesh(padded, origin, colors, transparent):
+    """build_chunk_mesh() as (vertices, triangles) for a MeshWorker."""
+    return interleave_mesh(*build_chunk_mesh(padded, origin, colors, transparent))
+
+
+class MeshWorker:
+    """Builds meshes on a worker thread.
+
+    build(*args) runs on the worker and returns (vertices, triangles) in
+    VERTEX_FORMAT, or anything else worth working out off the main thread
+    along with them. request() queues a build of a keyed mesh (a chunk, say)
+    and returns at once; pass it a snapshot of what the mesh is built from
+    (padded_chunk copies the blocks, so edits made meanwhile can't tear the
+    build). Lower priorities are built first. Requesting a key that is still
+    waiting replaces the old request, so a chunk edited several times is
+    built once. finished() gives the main thread the meshes completed since
+    its last call, each whole, to swap in; results overtaken by a newer
+    request or a cancel() are dropped. A build that raises is reported and
+    skipped, and the next request of its key tries again.
+    """
+
+    def __init__(self, build, threads=1, name='mesher'):
+        self.build = build
+        self.todo = {}      # key -> (priority, request number, args)
+        self.latest = {}    # key -> number of its latest request
+        self.building = 0
+        self.sequence = itertools.count()
+        self.results = queue.Queue()
+        self.wakeup = threading.Condition()
+        self.running = True
+        self.threads = [
+            threading.Thread(target=self._work, name=f'{name}-{i}', daemon=True)
+            for i in range(threads)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            with self.wakeup:
+                while self.running and not self.todo:
+                    self.wakeup.wait()
+                if not self.running:
+                    return
+                key = min(self.todo, key=lambda k: self.todo[k][:2])
+                _, number, args = self.todo.pop(key)
+                self.building += 1
+            try:
+                self.results.put((key, number, self.build(*args)))
+            except Exception:
+                # Keep whatever mesh key had, and keep the thread for the other builds
+                print(f'Building mesh {key} failed:', file=sys.stderr)
+                traceback.print_exc()
+                with self.wakeup:
+                    if self.latest.get(key) == number:
+                        del self.latest[key]
+            finally:
+                with self.wakeup:
+                    self.building -= 1
+                    self.wakeup.notify_all()
+
+    def request(self, key, priority, *args):
+        """Queue a (re)build of key's mesh from build(*args)."""
+        with self.wakeup:
+            number = next(self.sequence)
+            self.latest[key] = number
+            self.todo[key] = (priority, number, args)
+            self.wakeup.notify_all()
+
+    def cancel(self, key):
+        """Forget key's pending build, e.g. because its chunk unloaded."""
+        with self.wakeup:
+            self.todo.pop(key, None)
+            self.latest.pop(key, None)
+
+    def finished(self, wait=False):
+        """(key, what build returned) for every build completed since the last call.
+
+        With wait, every requested build is waited for first, so what has
+        been meshed doesn't depend on timing (used by replays).
+        """
+        if wait:
+            with self.wakeup:
+                while self.todo or self.building:
+                    self.wakeup.wait()
+        meshes = []
+        while True:
+            try:
+                key, number, mesh = self.results.get_nowait()
+            except queue.Empty:
+                return meshes
+            if self.latest.get(key) == number:
+                del self.latest[key]
+                meshes.append((key, mesh))
+
+    def stop(self):
+        with self.wakeup:
+            self.running = False
+            self.wakeup.notify_all()
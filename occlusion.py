@@ -0,0 +1,134 @@
+"""Occlusion culling: which chunk sections the camera can see into, through open space.
+
+Each chunk is cut into SECTIONS sections of SECTION_HEIGHT blocks. For
+every section, section_connectivity() records which of its six faces are
+joined by air or transparent blocks inside it. reachable_sections() then
+walks outwards from the camera's section, going from one section to the
+next only through faces its connectivity joins, and never back towards
+the camera. Sections it can't reach are closed off from the camera by
+opaque blocks, like valleys behind a mountain or anything underground
+when the camera is too. A chunk is drawn if any of its sections is reached.
+"""
+
+import collections
+import math
+
+import numpy as np
+
+from world import CHUNK_SIZE, WORLD_HEIGHT
+
+SECTION_HEIGHT = 16
+SECTIONS = WORLD_HEIGHT // SECTION_HEIGHT
+# Face directions, in the order of meshing.FACES; the opposite of face d is d ^ 1
+DIRECTIONS = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1))
+
+
+def _label(cells):
+    """Label the 6-connected components of the True cells; 0 elsewhere.
+
+    Each cell starts with its own label and repeatedly takes the lowest of
+    its neighbours' until nothing changes, all in array operations.
+    """
+    closed = ~cells
+    big = cells.size + 1
+    labels = np.arange(1, cells.size + 1, dtype=np.uint16).reshape(cells.shape)
+    labels[closed] = big
+    while True:
+        lowest = labels.copy()
+        for axis in range(3):
+            low = [slice(None)] * 3
+            high = [slice(None)] * 3
+            low[axis], high[axis] = slice(None, -1), slice(1, None)
+            np.minimum(lowest[tuple(high)], labels[tuple(low)], out=lowest[tuple(high)])
+            np.minimum(lowest[tuple(low)], labels[tuple(high)], out=lowest[tuple(low)])
+        lowest[closed] = big
+        if np.array_equal(lowest, labels):
+            labels[closed] = 0
+            return labels
+        labels = lowest
+
+
+def section_connectivity(blocks, transparent):
+    """Which faces of each of a chunk's sections are joined through open blocks.
+
+    blocks is the chunk's [x, z, y] block-ID array and transparent a lookup
+    table by block ID (air included). Returns (connectivity, labels):
+    connectivity is a (SECTIONS, 6, 6) bool array, where [s, a, b] is True
+    when a path through air or transparent blocks inside section s leads
+    from face a to face b (faces in DIRECTIONS order). labels is shaped
+    like blocks and numbers the open regions of each section, 0 where
+    blocks are opaque.
+    """
+    open_cells = transparent[blocks]
+    connectivity = np.zeros((SECTIONS, 6, 6), dtype=bool)
+    labels = np.zeros(blocks.shape, dtype=np.uint16)
+    for s in range(SECTIONS):
+        cells = open_cells[:, :, s * SECTION_HEIGHT:(s + 1) * SECTION_HEIGHT]
+        if cells.all():
+            connectivity[s] = True
+            labels[:, :, s * SECTION_HEIGHT:(s + 1) * SECTION_HEIGHT] = 1
+            continue
+        if not cells.any():
+            continue
+        section_labels = labels[:, :, s * SECTION_HEIGHT:(s + 1) * SECTION_HEIGHT] = _label(cells)
+        # Which labels are on each face, as a faces x labels table
+        on_face = np.zeros((6, cells.size + 1), dtype=np.int64)
+        for face, face_labels in enumerate(_faces(section_labels)):
+            on_face[face, face_labels.ravel()] = 1
+        on_face[:, 0] = 0  # opaque blocks
+        connectivity[s] = on_face @ on_face.T > 0
+    return connectivity, labels
+
+
+def _faces(section):
+    """A section's six boundary layers of an [x, z, y] array, in DIRECTIONS order."""
+    return section[-1], section[0], section[:, :, -1], section[:, :, 0], section[:, -1], section[:, 0]
+
+
+def camera_cell(position):
+    """The (x, y, z) block holding a world position."""
+    # Blocks fill x-0.5..x+0.5 and y-1..y (see meshing.py)
+    return math.floor(position[0] + 0.5), math.floor(position[1] + 1), math.floor(position[2] + 0.5)
+
+
+def reachable_sections(cell, sections):
+    """The (cx, section, cz) sections visible from the camera, in block cell.
+
+    sections maps (cx, cz) to the section_connectivity() of every chunk
+    that can be walked through. The walk leaves the camera's section
+    through the faces its open region touches (any face, if the camera is
+    inside an opaque block or outside the world's height), then goes
+    breadth first: a neighbour is reached through a face joined to the one
+    the walk came in by, and the walk never takes a step opposite to one
+    it already took, so it can't bend round behind something opaque.
+    Returns None when the camera's chunk isn't in sections, and nothing
+    can be said.
+    """
+    x, y, z = cell
+    chunk = (x // CHUNK_SIZE, z // CHUNK_SIZE)
+    if chunk not in sections:
+        return None
+    sy = min(max(y // SECTION_HEIGHT, 0), SECTIONS - 1)
+    exits = [True] * 6
+    if 0 <= y < WORLD_HEIGHT:
+        labels = sections[chunk][1]
+        label = labels[x % CHUNK_SIZE, z % CHUNK_SIZE, y]
+        if label:
+            section = labels[:, :, sy * SECTION_HEIGHT:(sy + 1) * SECTION_HEIGHT]
+            exits = [bool((face == label).any()) for face in _faces(section)]
+
+    start = (chunk[0], sy, chunk[1])
+    reached = {start}
+    queue = collections.deque([(start, None, 0)])  # section, face entered by, directions taken
+    while queue:
+        (cx, sy, cz), entered, taken = queue.popleft()
+        joined = exits if entered is None else sections[(cx, cz)][0][sy][entered]
+        for d, (dx, dy, dz) in enumerate(DIRECTIONS):
+            if taken & (1 << (d ^ 1)) or not joined[d]:
+                continue
+            section = (cx + dx, sy + dy, cz + dz)
+            if section in reached or not 0 <= section[1] < SECTIONS or (section[0], section[2]) not in sections:
+                continue
+            reached.add(section)
+            queue.append((section, d ^ 1, taken | (1 << d)))
+    return reached
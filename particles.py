@@ -0,0 +1,78 @@
+"""Pooled particles: preallocated arrays stepped together, drawn as one mesh."""
+
+import numpy as np
+
+from meshing import FACE_TRIANGLES, FACES
+
+# A unit cube centred on the origin as 12 unindexed triangles (36 corners)
+CUBE_CORNERS = (np.array([np.array(corners)[FACE_TRIANGLES] for _, corners in FACES], dtype=np.float32).reshape(-1, 3)
+                + np.array((0, 0.5, 0), dtype=np.float32))
+
+
+class ParticleSystem:
+    """Up to `capacity` cube particles with position, velocity, age, colour and scale.
+
+    Works as a TickScheduler object: tick() moves every live particle in one
+    vectorised step and returns False once none are left, and interpolate()
+    hands draw() the vertices of all of them as one (n * 36, 7) float32
+    array of interleaved position and RGBA.
+    """
+
+    gravity = 0.5
+    shrink = 0.95 ** 60  # scale kept per second
+
+    def __init__(self, capacity, draw, seed=None):
+        self.capacity = capacity
+        self.draw = draw
+        self.rng = np.random.default_rng(seed)
+        self.positions = np.zeros((capacity, 3), np.float32)
+        self.last_positions = np.zeros((capacity, 3), np.float32)
+        self.velocities = np.zeros((capacity, 3), np.float32)
+        self.ages = np.zeros(capacity, np.float32)
+        self.last_ages = np.zeros(capacity, np.float32)
+        self.lives = np.zeros(capacity, np.float32)
+        self.colors = np.zeros((capacity, 4), np.float32)
+        self.scales = np.zeros(capacity, np.float32)
+        self.alive = np.zeros(capacity, bool)
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
+
+    def emit(self, position, color, count, scale=0.15, life=0.5, spread=0.3):
+        """Burst count particles around position, reusing the oldest when full."""
+        free = np.flatnonzero(~self.alive)
+        if len(free) < count:
+            busy = np.flatnonzero(self.alive)
+            free = np.concatenate((free, busy[np.argsort(-self.ages[busy])]))
+        slots = free[:count]
+        n = len(slots)
+        start = np.asarray(position, np.float32) + self.rng.uniform(-spread, spread, (n, 3))
+        self.positions[slots] = start
+        self.last_positions[slots] = start
+        self.velocities[slots] = self.rng.uniform((-0.1, 0.1, -0.1), (0.1, 0.3, 0.1), (n, 3))
+        self.ages[slots] = 0
+        self.last_ages[slots] = 0
+        self.lives[slots] = life
+        self.colors[slots] = color
+        self.scales[slots] = scale
+        self.alive[slots] = True
+
+    def tick(self, dt):
+        alive = self.alive
+        self.last_positions[alive] = self.positions[alive]
+        self.last_ages[alive] = self.ages[alive]
+        self.positions[alive] += self.velocities[alive] * dt
+        self.velocities[alive, 1] -= self.gravity * dt
+        self.ages[alive] += dt
+        alive &= self.ages < self.lives
+        return bool(alive.any())
+
+    def interpolate(self, alpha):
+        slots = np.flatnonzero(self.alive)
+        positions = self.last_positions[slots] + (self.positions[slots] - self.last_positions[slots]) * alpha
+        ages = self.last_ages[slots] + (self.ages[slots] - self.last_ages[slots]) * alpha
+        scales = self.scales[slots] * self.shrink ** ages
+        vertices = np.empty((len(slots), len(CUBE_CORNERS), 7), np.float32)
+        vertices[:, :, :3] = positions[:, None, :] + CUBE_CORNERS * scales[:, None, None]
+        vertices[:, :, 3:] = self.colors[slots][:, None, :]
+        self.draw(vertices.reshape(-1, 7))
@@ -0,0 +1,127 @@
+"""Player movement: an upright box swept through the block grid."""
+
+import math
+
+from world import CHUNK_SIZE, WORLD_HEIGHT
+
+EPSILON = 1e-6  # touching a block's face isn't overlapping it
+JUMP_CLEARANCE = 0.05  # a jump tops out this far above jump_height, so it clears a step that tall
+
+
+class PlayerBody:
+    """The player's collision box, moved against a BlockIndex directly.
+
+    The box is width across and height tall, standing on position (the
+    middle of its feet), and the eyes are eye_height up, inside the box so
+    the camera can't poke into a ceiling the box is touching. move() goes one axis at a time and only looks up
+    the cells the box sweeps into, so a step costs the same however big
+    the world is. A walk blocked by something no taller than step_height
+    steps up onto it. Unloaded chunks and everything below the world count
+    as solid, so the player waits at the edge of the loaded world instead
+    of falling through it.
+    """
+
+    def __init__(self, world, position, width=0.6, height=2, eye_height=1.9, gravity=25, jump_height=1.25,
+                 step_height=0.5, max_fall_speed=50):
+        if not 0 <= eye_height < height:
+            raise ValueError(f'eye_height {eye_height} must be inside the box (height {height})')
+        self.world = world
+        self.position = [position[0], position[1], position[2]]
+        self.half_width = width / 2
+        self.height = height
+        self.eye_height = eye_height
+        self.gravity = gravity
+        self.jump_speed = math.sqrt(2 * gravity * (jump_height + JUMP_CLEARANCE))
+        self.step_height = step_height
+        self.max_fall_speed = max_fall_speed
+        self.vertical_speed = 0
+        self.grounded = False
+
+    def _box(self):
+        """The box's low and high corners in cell space, where block (x, y, z)
+        fills [x, x+1) on every axis (see BlockIndex.raycast)."""
+        x, y, z = self.position
+        w = self.half_width
+        return [x + 0.5 - w, y + 1, z + 0.5 - w], [x + 0.5 + w, y + 1 + self.height, z + 0.5 + w]
+
+    def _solid(self, x, y, z):
+        if y < 0:
+            return True
+        blocks = self.world.chunks.get((x // CHUNK_SIZE, z // CHUNK_SIZE))
+        if blocks is None:
+            return True
+        return y < WORLD_HEIGHT and blocks[x % CHUNK_SIZE, z % CHUNK_SIZE, y] != 0
+
+    def _blocked(self, low, high, axis, cell):
+        """Whether a solid block is in the layer of cells at `cell` along axis,
+        across the box's extent on the other two axes."""
+        ranges = [range(math.floor(low[a] + EPSILON), math.ceil(high[a] - EPSILON)) for a in range(3)]
+        ranges[axis] = (cell,)
+        for x in ranges[0]:
+            for y in ranges[1]:
+                for z in ranges[2]:
+                    if self._solid(x, y, z):
+                        return True
+        return False
+
+    def _sweep(self, axis, distance):
+        """Move along one axis by distance, stopping at the first solid block.
+
+        Returns how far the box went; exactly distance if nothing was in the way.
+        """
+        if distance == 0:
+            return 0
+        low, high = self._box()
+        if distance > 0:
+            for cell in range(math.ceil(high[axis] - EPSILON), math.ceil(high[axis] + distance - EPSILON)):
+                if self._blocked(low, high, axis, cell):
+                    distance = max(cell - high[axis], 0)
+                    break
+        else:
+            for cell in range(math.floor(low[axis] + EPSILON) - 1, math.floor(low[axis] + distance + EPSILON) - 1, -1):
+                if self._blocked(low, high, axis, cell):
+                    distance = min(cell + 1 - low[axis], 0)
+                    break
+        self.position[axis] += distance
+        return distance
+
+    def _walk(self, dx, dz):
+        """Sweep sideways; True if the box got the whole way."""
+        return self._sweep(0, dx) == dx and self._sweep(2, dz) == dz
+
+    def move(self, dx, dz, jump, dt):
+        """Walk by (dx, dz), jump if asked to and standing on something, and
+        fall for dt seconds."""
+        start = list(self.position)
+        if not self._walk(dx, dz) and self.grounded and self.step_height:
+            # Blocked: try the same walk from step_height up, and keep it if it got further
+            walked = self.position
+            self.position = list(start)
+            lift = self._sweep(1, self.step_height)
+            self._walk(dx, dz)
+            self._sweep(1, -lift)
+            if (walked[0] - start[0]) ** 2 + (walked[2] - start[2]) ** 2 >= \
+                    (self.position[0] - start[0]) ** 2 + (self.position[2] - start[2]) ** 2:
+                self.position = walked
+
+        if jump and self.grounded:
+            self.vertical_speed = self.jump_speed
+        # Along the exact arc, so a jump goes as high whatever the frame rate
+        dy = (self.vertical_speed - self.gravity * dt / 2) * dt
+        self.vertical_speed = max(self.vertical_speed - self.gravity * dt, -self.max_fall_speed)
+        moved = self._sweep(1, dy)
+        if moved != dy:
+            self.grounded = dy < 0
+            self.vertical_speed = 0  # landed, or hit the ceiling
+        elif dy:
+            self.grounded = False
+
+    def eye(self):
+        """World position of the eyes."""
+        x, y, z = self.position
+        return x, y + self.eye_height, z
+
+    def overlaps(self, x, y, z):
+        """Whether the block at (x, y, z) would be inside the box."""
+        low, high = self._box()
+        return all(low[a] + EPSILON < c + 1 and high[a] - EPSILON > c for a, c in enumerate((x, y, z)))
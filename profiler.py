@@ -0,0 +1,106 @@
+"""Frame profiler: named timing zones, rolling averages and Chrome trace export."""
+
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+_NULL_ZONE = contextlib.nullcontext()
+
+
+class _Zone:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+
+
+class Profiler:
+    """Times named zones of each frame while enabled.
+
+    `with profiler.zone('culling'):` times a block; while the profiler is
+    disabled zone() hands back a shared do-nothing context, so leaving
+    the zones in costs a flag check. Every zone run from the last
+    `history` seconds is kept for write_trace(), and averages() gives
+    per-zone milliseconds per frame over the last `window` frames.
+    """
+
+    def __init__(self, history=10.0, window=60):
+        self.enabled = False
+        self.history = history
+        self.window = window
+        self.events = collections.deque()  # (name, start, end, thread id)
+        self.frame_totals = {}              # zone -> seconds spent in it this frame
+        self.frames = collections.deque(maxlen=window)  # frame_totals of past frames
+        self.frame_start = None
+
+    def zone(self, name):
+        if not self.enabled:
+            return _NULL_ZONE
+        return _Zone(self, name)
+
+    def record(self, name, start, end):
+        """Add one timed run of a zone (perf_counter seconds)."""
+        if not self.enabled:
+            return
+        self.events.append((name, start, end, threading.get_ident()))
+        self.frame_totals[name] = self.frame_totals.get(name, 0) + end - start
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.events.clear()
+        self.frames.clear()
+        self.frame_totals = {}
+        self.frame_start = None
+
+    def next_frame(self):
+        """Close the current frame and start the next.
+
+        The time between frames that no zone covers (rendering, input and
+        the rest of the engine) is recorded under 'engine'.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            untracked = now - self.frame_start - sum(self.frame_totals.values())
+            if untracked > 0:
+                self.events.append(('engine', now - untracked, now, threading.get_ident()))
+                self.frame_totals['engine'] = untracked
+            self.frames.append(self.frame_totals)
+        self.frame_totals = {}
+        self.frame_start = now
+        cutoff = now - self.history
+        while self.events and self.events[0][1] < cutoff:
+            self.events.popleft()
+
+    def averages(self):
+        """(zone, average ms per frame) for the last window frames, slowest first."""
+        if not self.frames:
+            return []
+        totals = collections.Counter()
+        for frame in self.frames:
+            totals.update(frame)
+        return sorted(((name, total / len(self.frames) * 1000) for name, total in totals.items()),
+                      key=lambda item: -item[1])
+
+    def write_trace(self, path):
+        """Write the recorded zones as Chrome trace events (chrome://tracing, Perfetto)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        events = [{'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': tid,
+                   'ts': start * 1e6, 'dur': (end - start) * 1e6}
+                  for name, start, end, tid in self.events]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
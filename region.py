@@ -0,0 +1,130 @@
+"""Region save files: chunks stored as packed block-ID arrays.
+
+A region file holds up to REGION_SIZE x REGION_SIZE chunks:
+
+    header   magic b'MCFR', version, chunk size, world height, region size
+    table    one (offset, length) pair of uint32 per chunk slot, 0 = not saved
+    chunks   raw uint8 block-ID arrays, CHUNK_SIZE * CHUNK_SIZE * WORLD_HEIGHT bytes each
+
+Every chunk has the same size, so a chunk that is saved again is rewritten
+in place and new chunks are appended. Files are memory-mapped: reading a
+chunk touches only its own pages, never the rest of the file.
+"""
+
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from world import CHUNK_SIZE, WORLD_HEIGHT
+
+REGION_SIZE = 32  # chunks per region side
+MAGIC = b'MCFR'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHH')
+SLOT = struct.Struct('<II')
+TABLE_OFFSET = HEADER.size
+DATA_OFFSET = TABLE_OFFSET + REGION_SIZE * REGION_SIZE * SLOT.size
+CHUNK_SHAPE = (CHUNK_SIZE, CHUNK_SIZE, WORLD_HEIGHT)
+
+
+class RegionFile:
+    """One memory-mapped region file."""
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, CHUNK_SIZE, WORLD_HEIGHT, REGION_SIZE))
+                f.write(bytes(DATA_OFFSET - TABLE_OFFSET))
+        self.file = open(path, 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, version, chunk_size, height, region_size = HEADER.unpack_from(self.map, 0)
+        if (magic, version, chunk_size, height, region_size) != (MAGIC, VERSION, CHUNK_SIZE, WORLD_HEIGHT, REGION_SIZE):
+            self.close()
+            raise ValueError(f'{path} is not a compatible region file')
+
+    def _slot_offset(self, cx, cz):
+        return TABLE_OFFSET + ((cz % REGION_SIZE) * REGION_SIZE + cx % REGION_SIZE) * SLOT.size
+
+    def read(self, cx, cz):
+        """The chunk's block array, or None if it was never saved."""
+        offset, length = SLOT.unpack_from(self.map, self._slot_offset(cx, cz))
+        if not offset:
+            return None
+        data = np.frombuffer(self.map, dtype=np.uint8, count=length, offset=offset)
+        return data.reshape(CHUNK_SHAPE).copy()
+
+    def write(self, cx, cz, blocks):
+        data = np.ascontiguousarray(blocks, dtype=np.uint8).tobytes()
+        slot = self._slot_offset(cx, cz)
+        offset, length = SLOT.unpack_from(self.map, slot)
+        if offset:
+            # Same size every time, so overwrite in place
+            self.map[offset:offset + length] = data
+            return
+        offset = len(self.map)
+        self.map.close()
+        self.file.seek(offset)
+        self.file.write(data)
+        self.file.flush()
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        SLOT.pack_into(self.map, slot, offset, len(data))
+
+    def close(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+class RegionStore:
+    """Loads and saves chunks through a directory of region files.
+
+    Safe to use from the streaming threads and the main thread at once.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.regions = {}
+        self.lock = threading.Lock()
+
+    def _region(self, cx, cz, create):
+        key = (cx // REGION_SIZE, cz // REGION_SIZE)
+        region = self.regions.get(key)
+        if region is None:
+            path = os.path.join(self.directory, f'r.{key[0]}.{key[1]}.bin')
+            if not create and not os.path.exists(path):
+                return None
+            region = self.regions[key] = RegionFile(path)
+        return region
+
+    def load(self, cx, cz):
+        """The saved block array of a chunk, or None if it was never saved."""
+        with self.lock:
+            region = self._region(cx, cz, create=False)
+            return region.read(cx, cz) if region else None
+
+    def save(self, cx, cz, blocks):
+        with self.lock:
+            self._region(cx, cz, create=True).write(cx, cz, blocks)
+
+    def close(self):
+        with self.lock:
+            for region in self.regions.values():
+                region.close()
+            self.regions.clear()
+
+
+def load_world_seed(directory, new_seed):
+    """The seed a saved world was made with, or new_seed for a new world."""
+    path = os.path.join(directory, 'seed.txt')
+    if os.path.exists(path):
+        with open(path) as f:
+            return int(f.read())
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(str(new_seed))
+    return new_seed
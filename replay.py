@@ -0,0 +1,71 @@
+"""Recorded input sessions, and the numbers a replay of one reports.
+
+A session is the world seed plus one record per frame: the frame's dt,
+the key events that arrived before it, the held keys and the mouse
+velocity. Replaying feeds exactly those into the game frame by frame
+(see --replay in the game), so two replays of one session on the same
+code do the same thing, and the world and inventory hashes show whether
+a change altered gameplay.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+VERSION = 1
+
+
+class InputRecorder:
+    def __init__(self, seed):
+        self.seed = seed
+        self.frames = []
+        self.keys = []  # key events since the last frame
+
+    def key(self, key):
+        self.keys.append(key)
+
+    def frame(self, dt, held, mouse_velocity):
+        """Close a frame: dt, the keys held down and the mouse velocity (x, y)."""
+        self.frames.append({
+            'dt': dt,
+            'keys': self.keys,
+            'held': sorted(held),
+            'mouse': [mouse_velocity[0], mouse_velocity[1]],
+        })
+        self.keys = []
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'version': VERSION, 'seed': self.seed, 'frames': self.frames}, f)
+
+
+def load_session(path):
+    """(seed, frames) of a session saved by InputRecorder."""
+    with open(path) as f:
+        session = json.load(f)
+    if session.get('version') != VERSION:
+        raise ValueError(f'{path}: unsupported session version {session.get("version")}')
+    return session['seed'], session['frames']
+
+
+def frame_time_percentiles(frame_times):
+    """p50, p95 and p99 of frame times given in seconds, in milliseconds."""
+    if not frame_times:
+        return {}
+    p50, p95, p99 = np.percentile(np.asarray(frame_times) * 1000, (50, 95, 99))
+    return {'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+
+def world_hash(world):
+    """Hash of every loaded chunk's blocks, independent of load order."""
+    digest = hashlib.sha256()
+    for key in sorted(world.chunks):
+        digest.update(repr(key).encode())
+        digest.update(world.chunks[key].tobytes())
+    return digest.hexdigest()
+
+
+def inventory_hash(inventory):
+    """Hash of what is in every slot of an Inventory."""
+    return hashlib.sha256(repr([(slot.type, slot.count) for slot in inventory.slots]).encode()).hexdigest()
@@ -0,0 +1,52 @@
+"""Active-set scheduling: only objects with something to do get ticked.
+
+The simulation runs at a fixed rate whatever the frame rate: advance()
+turns frame time into whole ticks of `step` seconds. Objects have a
+tick(dt) method and an interpolate(alpha) method that places them between
+their last two ticks for rendering. tick returns False once the object
+has nothing left to do, and it goes to sleep. Sleeping objects cost
+nothing per frame until wake() puts them back.
+"""
+
+
+class TickScheduler:
+    def __init__(self, step=1 / 20, max_ticks=5):
+        self.step = step
+        self.max_ticks = max_ticks  # more than this per frame and the simulation slows down instead
+        self.accumulator = 0
+        self.active = {}  # object -> None; a dict keeps tick order stable
+        self.time = 0
+
+    def wake(self, obj):
+        """Tick obj every frame from now on."""
+        self.active[obj] = None
+
+    def sleep(self, obj):
+        """Stop ticking obj until something wakes it."""
+        self.active.pop(obj, None)
+        obj.interpolate(1)
+
+    def advance(self, frame_dt):
+        """Run the ticks frame_dt adds up to and interpolate the active objects.
+
+        Returns the number of ticks run.
+        """
+        self.accumulator += frame_dt
+        ticks = 0
+        while self.accumulator >= self.step and ticks < self.max_ticks:
+            self.tick(self.step)
+            self.accumulator -= self.step
+            ticks += 1
+        # Drop a backlog the frame rate can't catch up with
+        self.accumulator = min(self.accumulator, self.step)
+        alpha = self.accumulator / self.step
+        for obj in self.active:
+            obj.interpolate(alpha)
+        return ticks
+
+    def tick(self, dt):
+        self.time += dt
+        for obj in list(self.active):
+            # Skip anything an earlier tick put to sleep
+            if obj in self.active and obj.tick(dt) is False:
+                self.sleep(obj)
@@ -0,0 +1,144 @@
+"""Background chunk generation around the player."""
+
+import queue
+import sys
+import threading
+import traceback
+
+
+def chunks_in_radius(center, radius):
+    """Chunk keys within radius chunks of center, nearest first."""
+    cx, cz = center
+    keys = [
+        (cx + dx, cz + dz)
+        for dx in range(-radius, radius + 1)
+        for dz in range(-radius, radius + 1)
+        if dx * dx + dz * dz <= radius * radius
+    ]
+    keys.sort(key=lambda key: (key[0] - cx) ** 2 + (key[1] - cz) ** 2)
+    return keys
+
+
+def chunk_distance_sq(a, b):
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2
+
+
+class ChunkStreamer:
+    """Loads chunks in rings around a moving centre on worker threads.
+
+    generate(cx, cz) runs on a worker. Use more than one thread when
+    generate hands the work to a process pool, so several chunks are in
+    flight at once. Results come back to the main thread through a queue
+    and are handed out by update(), a few per frame, so the caller never
+    waits on generation. Chunks further than unload_radius from the centre
+    are handed back for unloading. Keep unload_radius above load_radius so
+    walking along a chunk border doesn't load and unload the same chunks
+    over and over.
+    """
+
+    def __init__(self, generate, load_radius, unload_radius, max_loads_per_frame=2, threads=1):
+        self.generate = generate
+        self.load_radius = load_radius
+        self.unload_radius = unload_radius
+        self.max_loads_per_frame = max_loads_per_frame
+        self.center = None
+        self.loaded = set()
+        self.todo = set()      # requested but not yet picked up by the worker
+        self.pending = set()   # requested and not yet handed back
+        self.results = queue.Queue()
+        self.wakeup = threading.Condition()
+        self.running = True
+        self.threads = [
+            threading.Thread(target=self._work, name=f'chunk-streamer-{i}', daemon=True)
+            for i in range(threads)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            with self.wakeup:
+                while self.running and not self.todo:
+                    self.wakeup.wait()
+                if not self.running:
+                    return
+                # Always generate whatever is nearest to the player right now
+                center = self.center
+                chunk = min(self.todo, key=lambda key: chunk_distance_sq(key, center))
+                self.todo.discard(chunk)
+            try:
+                self.results.put((chunk, self.generate(*chunk), True))
+            except Exception:
+                # Hand the failure back so the chunk isn't waited for forever
+                print(f'Generating chunk {chunk} failed:', file=sys.stderr)
+                traceback.print_exc()
+                self.results.put((chunk, None, False))
+
+    def preload(self, center, radius):
+        """Generate the chunks around center right away on the calling thread.
+
+        Used at startup so there is ground under the player before the first
+        frame. Returns the (chunk, data) pairs.
+        """
+        loaded = []
+        for chunk in chunks_in_radius(center, radius):
+            if chunk not in self.loaded:
+                self.loaded.add(chunk)
+                loaded.append((chunk, self.generate(*chunk)))
+        return loaded
+
+    def update(self, center, wait=False):
+        """Track the player's chunk; call once per frame on the main thread.
+
+        Returns (loaded, unloaded): newly generated (chunk, data) pairs, and
+        chunk keys that are now out of range. With wait, every requested
+        chunk is waited for and handed back at once, so what is loaded
+        doesn't depend on timing (used by replays). A chunk whose generation
+        failed is left unloaded and asked for again once the centre moves.
+        """
+        unloaded = []
+        if center != self.center:
+            wanted = chunks_in_radius(center, self.load_radius)
+            with self.wakeup:
+                self.center = center
+                # Requests the player has walked away from are dropped
+                dropped = self.todo.difference(wanted)
+                self.todo -= dropped
+                self.pending -= dropped
+                for chunk in wanted:
+                    if chunk not in self.loaded and chunk not in self.pending:
+                        self.todo.add(chunk)
+                        self.pending.add(chunk)
+                self.wakeup.notify_all()
+            limit = self.unload_radius * self.unload_radius
+            unloaded = [chunk for chunk in self.loaded if chunk_distance_sq(chunk, center) > limit]
+            self.loaded.difference_update(unloaded)
+
+        loaded = []
+        while wait or len(loaded) < self.max_loads_per_frame:
+            try:
+                if wait and self.pending:
+                    chunk, data, generated = self.results.get()
+                else:
+                    chunk, data, generated = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(chunk)
+            if not generated:
+                continue
+            # Skip chunks that went out of range while they were generating
+            limit = self.unload_radius * self.unload_radius
+            if chunk in self.loaded or chunk_distance_sq(chunk, self.center) > limit:
+                continue
+            self.loaded.add(chunk)
+            loaded.append((chunk, data))
+        return loaded, unloaded
+
+    def stop(self, timeout=5):
+        """Stop the workers and wait for them, so none is still inside
+        generate when whatever it calls is shut down."""
+        with self.wakeup:
+            self.running = False
+            self.wakeup.notify_all()
+        for thread in self.threads:
+            thread.join(timeout)
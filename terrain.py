@@ -0,0 +1,494 @@
+"""Terrain generation: biomes, heightmaps and block layers.
+
+Every rule exists twice. The scalar functions (get_biome, get_biome_blend,
+column_height) are the reference. generate_region computes the same thing
+for a whole rectangle at once with NumPy, and matches generate_region_scalar
+bit for bit for any noise seed.
+
+Noise at integer columns goes through tile caches (see NoiseCache). Setting
+a cache's size to 0 makes every lookup call PerlinNoise directly, which
+turns generate_region_scalar into a fully independent reference.
+
+Everything is driven by the world seed (set_seed). Tree and cactus rolls
+come from a random generator derived from the seed and the chunk, so any
+chunk comes out the same whichever process generates it and in whatever
+order.
+"""
+
+import multiprocessing
+import os
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from perlin_noise import PerlinNoise
+from perlin_noise.tools import fade, hasher
+
+from blocks import CACTUS, DIRT, GRASS, LEAVES, SAND, STONE, WOOD
+from world import CHUNK_SIZE, WORLD_HEIGHT
+
+MAX_HEIGHT = 10
+
+BIOME_NAMES = ('plains', 'mountains', 'desert')
+BIOME_SCALE = 0.05   # noise scale of the biome map
+HEIGHT_SCALE = 0.1   # noise scale of the heightmap
+NOISE_CACHE_BYTES = 2 * 1024 * 1024  # memory cap of each noise cache
+BIOME_PAD = 2  # furthest biome sample from a column (BLEND_OFFSETS and NEIGHBOUR_BIOME_OFFSETS)
+
+# Per-biome top block and the block used for the 3 layers below it
+BIOME_LAYERS = {
+    'plains': (GRASS, DIRT),
+    'mountains': (GRASS, STONE),
+    'desert': (SAND, SAND),
+}
+# Neighbours sampled by get_biome_blend, in order
+BLEND_OFFSETS = ((2, 0), (-2, 0), (0, 2), (0, -2), (1, 1), (-1, -1))
+# Neighbours searched (in order) for the biome to blend heights with
+NEIGHBOUR_BIOME_OFFSETS = ((2, 0), (-2, 0), (0, 2), (0, -2))
+
+# Trees per column in each biome (desert grows cacti instead)
+TREE_CHANCE = {'plains': 0.01, 'mountains': 0.03, 'desert': 0}
+CACTUS_CHANCE = 0.03
+
+
+class NoiseCache:
+    """LRU cache of noise samples at integer columns, stored in square tiles.
+
+    A miss computes the whole tile with noise_grid, so neighbouring lookups
+    and region generation reuse it. Tiles are evicted least recently used
+    first once their total size passes max_bytes. Safe to share between the
+    chunk generator thread and the main thread.
+    """
+
+    def __init__(self, noise, scale, tile_size=16, max_bytes=NOISE_CACHE_BYTES):
+        self.noise = noise
+        self.scale = scale
+        self.tile_size = tile_size
+        self.tile_bytes = tile_size * tile_size * 8
+        self.max_bytes = max_bytes
+        self.tiles = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def resize(self, max_bytes):
+        with self.lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self.lock:
+            self.tiles.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'tiles': len(self.tiles),
+            'bytes': len(self.tiles) * self.tile_bytes,
+        }
+
+    def _evict(self):
+        while self.tiles and len(self.tiles) * self.tile_bytes > self.max_bytes:
+            self.tiles.popitem(last=False)
+
+    def tile(self, tx, tz):
+        """The noise array of one tile, computing it on a miss."""
+        with self.lock:
+            samples = self.tiles.get((tx, tz))
+            if samples is not None:
+                self.hits += 1
+                self.tiles.move_to_end((tx, tz))
+                return samples
+            self.misses += 1
+        size = self.tile_size
+        xs = np.arange(tx * size, (tx + 1) * size)
+        zs = np.arange(tz * size, (tz + 1) * size)
+        samples = noise_grid(self.noise, xs * self.scale, zs * self.scale)
+        with self.lock:
+            self.tiles[(tx, tz)] = samples
+            self._evict()
+        return samples
+
+    def sample(self, x, z):
+        """noise([x * scale, z * scale]) for an integer column."""
+        if self.max_bytes < self.tile_bytes:
+            return self.noise([x * self.scale, z * self.scale])
+        size = self.tile_size
+        return float(self.tile(x // size, z // size)[x % size, z % size])
+
+    def grid(self, x0, z0, width, depth):
+        """Samples for a width x depth rectangle of columns, assembled from tiles."""
+        if self.max_bytes < self.tile_bytes:
+            xs = np.arange(x0, x0 + width)
+            zs = np.arange(z0, z0 + depth)
+            return noise_grid(self.noise, xs * self.scale, zs * self.scale)
+        size = self.tile_size
+        out = np.empty((width, depth))
+        for tx in range(x0 // size, (x0 + width - 1) // size + 1):
+            for tz in range(z0 // size, (z0 + depth - 1) // size + 1):
+                samples = self.tile(tx, tz)
+                # Overlap of this tile with the requested rectangle
+                ax, bx = max(x0, tx * size), min(x0 + width, (tx + 1) * size)
+                az, bz = max(z0, tz * size), min(z0 + depth, (tz + 1) * size)
+                out[ax - x0:bx - x0, az - z0:bz - z0] = samples[ax - tx * size:bx - tx * size, az - tz * size:bz - tz * size]
+        return out
+
+
+def get_biome(x, z):
+    """Determine biome using Perlin noise for organic distribution."""
+    # Use noise for biome distribution - adjusted scale for more variety
+    biome_noise = biome_noise_cache.sample(x, z)
+
+    # Adjusted thresholds to ensure all 3 biomes appear
+    if biome_noise < -0.2:
+        return 'plains'
+    elif biome_noise < 0.4:
+        return 'mountains'
+    else:
+        return 'desert'
+
+
+def get_biome_blend(x, z):
+    """Get blending factor between biomes for smooth transitions."""
+    # Sample multiple points to determine transition
+    center_biome = get_biome(x, z)
+
+    # Sample nearby points
+    samples = [get_biome(x + dx, z + dz) for dx, dz in BLEND_OFFSETS]
+
+    # Check if we're in a transition zone
+    transition_count = sum(1 for s in samples if s != center_biome)
+    blend_factor = transition_count / len(samples)
+
+    return center_biome, blend_factor
+
+
+def blend_value(val1, val2, factor):
+    """Blend between two values based on factor (0-1)."""
+    return val1 * (1 - factor) + val2 * factor
+
+
+def biome_height(biome, noise_val):
+    """Column height a biome gives for a heightmap noise value."""
+    if biome == 'plains':
+        return int((noise_val + 1) * 4) + 2
+    elif biome == 'mountains':
+        return int((noise_val + 1) * MAX_HEIGHT * 1.5)
+    else:  # desert
+        return int((noise_val + 1) * 3) + 2
+
+
+def column_height(x, z):
+    """Return (biome, blend_factor, height) for one column."""
+    biome, blend_factor = get_biome_blend(x, z)
+    noise_val = height_noise_cache.sample(x, z)
+    height = biome_height(biome, noise_val)
+
+    # If in transition zone, blend with neighboring biome
+    if blend_factor > 0:
+        neighbor_biome = None
+        for dx, dz in NEIGHBOUR_BIOME_OFFSETS:
+            nb = get_biome(x + dx, z + dz)
+            if nb != biome:
+                neighbor_biome = nb
+                break
+        if neighbor_biome:
+            neighbor_height = biome_height(neighbor_biome, noise_val)
+            height = int(blend_value(height, neighbor_height, blend_factor * 0.7))
+    return biome, blend_factor, height
+
+
+def generate_region_scalar(x0, z0, width, depth):
+    """Reference generator: one column at a time through the scalar functions.
+
+    Returns (biomes, blend, heights, blocks) shaped like generate_region's.
+    """
+    biomes = np.zeros((width, depth), dtype=np.uint8)
+    blend = np.zeros((width, depth))
+    heights = np.zeros((width, depth), dtype=np.int64)
+    blocks = np.zeros((width, depth, WORLD_HEIGHT), dtype=np.uint8)
+    for i in range(width):
+        for k in range(depth):
+            biome, blend_factor, height = column_height(x0 + i, z0 + k)
+            biomes[i, k] = BIOME_NAMES.index(biome)
+            blend[i, k] = blend_factor
+            heights[i, k] = height
+            surface, underground = BIOME_LAYERS[biome]
+            for y in range(min(height, WORLD_HEIGHT)):
+                if y == height - 1:
+                    blocks[i, k, y] = surface
+                elif y > height - 4:
+                    blocks[i, k, y] = underground
+                else:
+                    blocks[i, k, y] = STONE
+    return biomes, blend, heights, blocks
+
+
+def _axis_samples(coords):
+    """Lattice cells, offsets and fade weights of noise samples along one axis.
+
+    The offsets go to the lower and upper lattice line. Fade is evaluated
+    through the library's own function, once per coordinate rather than
+    once per sample, so the weights are exactly the scalar ones.
+    """
+    cells = np.floor(coords)
+    lower = coords - cells
+    upper = coords - (cells + 1)
+    lower_weight = np.array([fade(1 - abs(d)) for d in lower.tolist()])
+    upper_weight = np.array([fade(1 - abs(d)) for d in upper.tolist()])
+    return cells.astype(np.int64), ((0, lower, lower_weight), (1, upper, upper_weight))
+
+
+def _gradient(noise, cell):
+    """The gradient vector noise uses at a lattice point.
+
+    PerlinNoise draws it by reseeding the global random module and putting
+    its state back, which goes wrong when two threads do it at once (the
+    main thread and the LOD mesher both sample noise). The same draws from a
+    private generator give the same vector without touching shared state.
+    """
+    rng = random.Random(noise.seed * hasher(cell))
+    return rng.uniform(-1, 1), rng.uniform(-1, 1)
+
+
+def noise_grid(noise, xs, zs):
+    """Evaluate noise([x, z]) for every x in xs and z in zs as a (len(xs), len(zs)) array.
+
+    Matches calling noise() per point bit for bit. The gradient vectors are
+    worked out once per lattice point (see _gradient), and the weighted sum
+    is done in the same order as PerlinNoise.noise. Safe to call from any
+    thread.
+    """
+    cells_x, corners_x = _axis_samples(np.asarray(xs, dtype=np.float64) * noise.octaves)
+    cells_z, corners_z = _axis_samples(np.asarray(zs, dtype=np.float64) * noise.octaves)
+    min_x, min_z = int(cells_x.min()), int(cells_z.min())
+    lattice_w = int(cells_x.max()) - min_x + 2
+    lattice_d = int(cells_z.max()) - min_z + 2
+    gradients = np.empty((lattice_w, lattice_d, 2))
+    for i in range(lattice_w):
+        for k in range(lattice_d):
+            gradients[i, k] = _gradient(noise, (min_x + i, min_z + k))
+
+    total = 0
+    # itertools.product order: (x0, z0), (x0, z1), (x1, z0), (x1, z1)
+    for corner_x, dist_x, weight_x in corners_x:
+        for corner_z, dist_z, weight_z in corners_z:
+            vec = gradients[np.ix_(cells_x - min_x + corner_x, cells_z - min_z + corner_z)]
+            weight = weight_x[:, None] * weight_z[None, :]
+            dot = vec[..., 0] * dist_x[:, None] + vec[..., 1] * dist_z[None, :]
+            total = total + weight * dot
+    return total
+
+
+def _biome_codes(noise_vals):
+    return np.where(noise_vals < -0.2, 0, np.where(noise_vals < 0.4, 1, 2)).astype(np.uint8)
+
+
+def _biome_heights(biomes, noise_vals):
+    """Vectorised biome_height."""
+    plains = ((noise_vals + 1) * 4).astype(np.int64) + 2
+    mountains = ((noise_vals + 1) * MAX_HEIGHT * 1.5).astype(np.int64)
+    desert = ((noise_vals + 1) * 3).astype(np.int64) + 2
+    return np.choose(biomes, (plains, mountains, desert))
+
+
+def _blended_heights(sampled, noise_vals):
+    """(biomes, blend, heights) for a grid of columns.
+
+    sampled(dx, dz) gives the biome codes of the columns offset by (dx, dz)
+    from each one (up to BIOME_PAD away), and noise_vals their heightmap noise.
+    """
+    biomes = sampled(0, 0)
+    transition_count = sum((sampled(dx, dz) != biomes).astype(np.int64) for dx, dz in BLEND_OFFSETS)
+    blend = transition_count / len(BLEND_OFFSETS)
+    heights = _biome_heights(biomes, noise_vals)
+
+    # First neighbour (in search order) whose biome differs from the column's
+    neighbour = biomes.copy()
+    found = np.zeros(biomes.shape, dtype=bool)
+    for dx, dz in NEIGHBOUR_BIOME_OFFSETS:
+        sample = sampled(dx, dz)
+        take = ~found & (sample != biomes)
+        neighbour[take] = sample[take]
+        found |= take
+    factor = blend * 0.7
+    blended = (heights * (1 - factor) + _biome_heights(neighbour, noise_vals) * factor).astype(np.int64)
+    return biomes, blend, np.where((blend > 0) & found, blended, heights)
+
+
+def _surface_blocks(biomes):
+    """(surface, underground) block IDs of each column's biome."""
+    surface = np.choose(biomes, [BIOME_LAYERS[name][0] for name in BIOME_NAMES]).astype(np.uint8)
+    underground = np.choose(biomes, [BIOME_LAYERS[name][1] for name in BIOME_NAMES]).astype(np.uint8)
+    return surface, underground
+
+
+def generate_region(x0, z0, width, depth):
+    """Generate a width x depth rectangle of columns starting at (x0, z0).
+
+    Returns (biomes, blend, heights, blocks). biomes holds indices into
+    BIOME_NAMES, and blocks[i, k, y] holds block IDs for column
+    (x0 + i, z0 + k).
+    """
+    pad = BIOME_PAD
+    biome_map = _biome_codes(biome_noise_cache.grid(x0 - pad, z0 - pad, width + 2 * pad, depth + 2 * pad))
+
+    def sampled(dx, dz):
+        return biome_map[pad + dx:pad + dx + width, pad + dz:pad + dz + depth]
+
+    biomes, blend, heights = _blended_heights(sampled, height_noise_cache.grid(x0, z0, width, depth))
+
+    # Layer rules: surface block on top, 3 layers of underground block, stone below
+    surface, underground = _surface_blocks(biomes)
+    y = np.arange(WORLD_HEIGHT)[None, None, :]
+    h = heights[:, :, None]
+    blocks = np.where(y < h - 3, STONE, 0).astype(np.uint8)
+    blocks = np.where((y >= h - 3) & (y < h - 1), underground[:, :, None], blocks)
+    blocks = np.where(y == h - 1, surface[:, :, None], blocks)
+    return biomes, blend, heights, blocks
+
+
+def generate_surface(x0, z0, width, depth, step):
+    """Heights and top block IDs of every step-th column, for distant terrain.
+
+    Samples columns x0, x0 + step, ... x0 + width (width // step + 1 of
+    them, likewise along z), so neighbouring rectangles share their edge
+    samples. They come straight from the noise at just those columns, so
+    the work grows with the samples rather than the area. Each sample
+    matches generate_region's column; trees and cacti are left out.
+    """
+    xs = x0 + step * np.arange(width // step + 1)
+    zs = z0 + step * np.arange(depth // step + 1)
+    pad = BIOME_PAD
+    offsets = np.arange(-pad, pad + 1)
+    # Biome codes of every sample and its neighbours out to pad, as [x, dx, z, dz]
+    biome_map = _biome_codes(noise_grid(pnoise, (xs[:, None] + offsets).ravel() * BIOME_SCALE,
+                                        (zs[:, None] + offsets).ravel() * BIOME_SCALE))
+    biome_map = biome_map.reshape(len(xs), len(offsets), len(zs), len(offsets))
+
+    def sampled(dx, dz):
+        return biome_map[:, pad + dx, :, pad + dz]
+
+    biomes, _, heights = _blended_heights(sampled, noise_grid(pnoise, xs * HEIGHT_SCALE, zs * HEIGHT_SCALE))
+    return heights, _surface_blocks(biomes)[0]
+
+
+def set_seed(seed):
+    """Seed the world: every noise sample and feature roll derives from this.
+
+    Resets the noise caches, so call it before generating anything.
+    """
+    global world_seed, pnoise, biome_noise_cache, height_noise_cache
+    world_seed = seed
+    pnoise = PerlinNoise(seed=seed)
+    # Per-column noise caches in front of pnoise for the biome map and heightmap
+    biome_noise_cache = NoiseCache(pnoise, BIOME_SCALE)
+    height_noise_cache = NoiseCache(pnoise, HEIGHT_SCALE)
+
+
+def chunk_rng(cx, cz):
+    """Random generator for one chunk, derived from the world seed alone."""
+    return np.random.default_rng([world_seed, cx & 0xFFFFFFFF, cz & 0xFFFFFFFF])
+
+
+def feature_rolls(x0, z0, width, depth):
+    """Per-column (feature roll, cactus height) arrays for any rectangle.
+
+    Each column's values come from its own chunk's generator, drawn for the
+    whole chunk in a fixed order, so a column rolls the same whichever
+    chunk asks.
+    """
+    rolls = np.empty((width, depth))
+    cactus_heights = np.empty((width, depth), dtype=np.int64)
+    for cx in range(x0 // CHUNK_SIZE, (x0 + width - 1) // CHUNK_SIZE + 1):
+        for cz in range(z0 // CHUNK_SIZE, (z0 + depth - 1) // CHUNK_SIZE + 1):
+            rng = chunk_rng(cx, cz)
+            chunk_rolls = rng.random((CHUNK_SIZE, CHUNK_SIZE))
+            chunk_cacti = rng.integers(2, 5, (CHUNK_SIZE, CHUNK_SIZE))
+            # Overlap of this chunk with the requested rectangle
+            ax, bx = max(x0, cx * CHUNK_SIZE), min(x0 + width, (cx + 1) * CHUNK_SIZE)
+            az, bz = max(z0, cz * CHUNK_SIZE), min(z0 + depth, (cz + 1) * CHUNK_SIZE)
+            src = (slice(ax - cx * CHUNK_SIZE, bx - cx * CHUNK_SIZE), slice(az - cz * CHUNK_SIZE, bz - cz * CHUNK_SIZE))
+            dst = (slice(ax - x0, bx - x0), slice(az - z0, bz - z0))
+            rolls[dst] = chunk_rolls[src]
+            cactus_heights[dst] = chunk_cacti[src]
+    return rolls, cactus_heights
+
+
+def place_tree(blocks, i, y, k):
+    """Write a tree into a block array with its trunk base at (i, y, k)."""
+    # Trunk
+    blocks[i, k, y:y + 3] = WOOD
+    # Leaves (clipped where the tree hangs over the edge of the array)
+    blocks[max(i - 1, 0):i + 2, max(k - 1, 0):k + 2, y + 3] = LEAVES
+
+
+def place_cactus(blocks, i, y, k, height):
+    # Cactus trunk
+    blocks[i, k, y:y + height] = CACTUS
+
+
+def generate_chunk(cx, cz):
+    """Blocks of one chunk, trees and cacti included.
+
+    Returns a (CHUNK_SIZE, CHUNK_SIZE, WORLD_HEIGHT) uint8 array of
+    block IDs indexed [x, z, y] from the chunk's corner.
+    """
+    # Generate one column beyond the chunk on every side so trees rooted
+    # in a neighbour still drop their leaves in here
+    pad = 1
+    size = CHUNK_SIZE + 2 * pad
+    x0, z0 = cx * CHUNK_SIZE - pad, cz * CHUNK_SIZE - pad
+    biomes, blend, heights, blocks = generate_region(x0, z0, size, size)
+    rolls, cactus_heights = feature_rolls(x0, z0, size, size)
+
+    desert = biomes == BIOME_NAMES.index('desert')
+    tree_chance = np.choose(biomes, [TREE_CHANCE[name] for name in BIOME_NAMES])
+    grows = (blend < 0.5) & (heights > 2) & (heights + 4 <= WORLD_HEIGHT)
+    # Trees in plains and mountains, cacti in desert
+    trees = grows & ~desert & (rolls < tree_chance)
+    cacti = grows & desert & (rolls < CACTUS_CHANCE)
+    # Walk columns in world (z, x) order so overlapping trees settle the
+    # same way in every chunk that sees them
+    for k, i in zip(*np.nonzero(trees.T)):
+        place_tree(blocks, i, int(heights[i, k]), k)
+    for k, i in zip(*np.nonzero(cacti.T)):
+        place_cactus(blocks, i, int(heights[i, k]), k, int(cactus_heights[i, k]))
+    return blocks[pad:-pad, pad:-pad].copy()
+
+
+class ChunkGeneratorPool:
+    """Generates chunks in parallel worker processes, one per core by default.
+
+    Workers are started with the spawn method and seeded once, so their
+    output matches generate_chunk in this process exactly.
+    """
+
+    def __init__(self, seed, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=set_seed,
+            initargs=(seed,),
+        )
+
+    def generate(self, cx, cz):
+        """Generate one chunk in a worker, blocking until it's done."""
+        return self.executor.submit(generate_chunk, cx, cz).result()
+
+    def generate_many(self, chunks):
+        """Generate a list of (cx, cz) chunks in parallel, returned in order."""
+        return list(self.executor.map(generate_chunk, [c[0] for c in chunks], [c[1] for c in chunks]))
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+# Unseeded until the game picks a seed, like PerlinNoise on its own
+set_seed(random.randint(1, 2 ** 31 - 1))
@@ -0,0 +1,36 @@
+import time
+
+from audio import AudioService
+
+
+class SlowBackend:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.played = 0
+
+    def load(self, name, wav):
+        return name
+
+    def play(self, sound):
+        time.sleep(self.seconds)
+        self.played += 1
+
+
+def test_close_returns_with_a_full_queue_and_a_slow_backend():
+    backend = SlowBackend(0.2)
+    audio = AudioService(backend, queue_size=2, repeat_interval=0)
+    for frequency in range(100, 110):
+        audio.tone(frequency, 10)
+    assert audio.queue.full()
+    start = time.monotonic()
+    audio.close(timeout=2)
+    assert time.monotonic() - start < 1
+    assert not audio.thread.is_alive()
+    # At most the sound already playing when close was called
+    assert backend.played <= 1
+
+
+def test_close_wakes_an_idle_worker():
+    audio = AudioService(SlowBackend(0))
+    audio.close()
+    assert not audio.thread.is_alive()
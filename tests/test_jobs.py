@@ -0,0 +1,27 @@
+from jobs import JobQueue
+
+
+def test_more_urgent_resubmission_replaces_the_queued_job():
+    jobs = JobQueue()
+    ran = []
+    jobs.submit(5, ran.append, 'other')
+    jobs.submit(10, ran.append, 'streamed', key='chunk')
+    jobs.submit(0, ran.append, 'edited', key='chunk')
+    assert len(jobs) == 2
+    jobs.drain()
+    assert ran == ['edited', 'other']
+    assert len(jobs) == 0
+
+
+def test_less_urgent_resubmission_is_coalesced():
+    jobs = JobQueue()
+    ran = []
+    jobs.submit(0, ran.append, 'edited', key='chunk')
+    jobs.submit(10, ran.append, 'streamed', key='chunk')
+    assert len(jobs) == 1
+    jobs.drain()
+    assert ran == ['edited']
+    # Once run, the key can be queued again
+    jobs.submit(10, ran.append, 'again', key='chunk')
+    jobs.drain()
+    assert ran == ['edited', 'again']
@@ -0,0 +1,19 @@
+from meshing import MeshWorker
+
+
+def test_worker_survives_a_failed_build():
+    def build(value):
+        if value is None:
+            raise ValueError('bad snapshot')
+        return value
+
+    worker = MeshWorker(build)
+    try:
+        worker.request('a', 0, None)
+        worker.request('b', 1, 'mesh b')
+        # Would wait forever if the failure had killed the thread
+        assert worker.finished(wait=True) == [('b', 'mesh b')]
+        worker.request('a', 0, 'mesh a')
+        assert worker.finished(wait=True) == [('a', 'mesh a')]
+    finally:
+        worker.stop()
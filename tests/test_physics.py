@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from blocks import STONE
+from physics import PlayerBody
+from world import BlockIndex
+
+FLOOR = 9  # top block of the floor; the player stands at y = FLOOR
+
+
+def room(headroom):
+    """A world with a stone floor and a stone ceiling headroom blocks above it."""
+    world = BlockIndex()
+    blocks = np.zeros((16, 16, 64), np.uint8)
+    blocks[:, :, :FLOOR + 1] = STONE
+    blocks[:, :, FLOOR + 1 + headroom] = STONE
+    for chunk in ((0, 0), (-1, 0), (0, -1), (-1, -1)):
+        world.add_chunk(*chunk, blocks.copy())
+    return world
+
+
+@pytest.mark.parametrize('headroom', (2, 3))
+def test_eye_stays_inside_the_box_after_a_head_bump(headroom):
+    body = PlayerBody(room(headroom), (4, FLOOR, 4), jump_height=2, step_height=1)
+    # Blocks fill y-1..y, so the ceiling's bottom face is at FLOOR + headroom
+    ceiling = FLOOR + headroom
+    bumped = False
+    for _ in range(240):
+        body.move(0, 0, True, 1 / 60)
+        eye = body.eye()[1]
+        assert eye < body.position[1] + body.height
+        assert eye < ceiling
+        bumped = bumped or body.position[1] + body.height > ceiling - 1e-3
+    assert bumped
+
+
+def test_eye_must_be_inside_the_box():
+    with pytest.raises(ValueError):
+        PlayerBody(room(3), (4, FLOOR, 4), height=1.8, eye_height=2)
@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pytest
+
+from region import CHUNK_SHAPE, HEADER, MAGIC, REGION_SIZE, RegionFile, RegionStore
+
+
+def random_chunk(rng):
+    return rng.integers(0, 11, CHUNK_SHAPE, dtype=np.uint8)
+
+
+def test_chunks_round_trip_through_reopened_files(tmp_path):
+    rng = np.random.default_rng(8)
+    # Across several regions, negative coordinates included
+    chunks = {(cx, cz): random_chunk(rng) for cx, cz in ((0, 0), (1, 0), (-1, -1), (REGION_SIZE, 5), (-40, 70))}
+    store = RegionStore(tmp_path)
+    for (cx, cz), blocks in chunks.items():
+        store.save(cx, cz, blocks)
+    # Saved again: rewritten in place
+    chunks[(1, 0)] = random_chunk(rng)
+    store.save(1, 0, chunks[(1, 0)])
+    store.close()
+
+    store = RegionStore(tmp_path)
+    for (cx, cz), blocks in chunks.items():
+        assert np.array_equal(store.load(cx, cz), blocks), (cx, cz)
+    assert store.load(2, 2) is None
+    assert store.load(1000, 1000) is None
+    store.close()
+
+
+def test_incompatible_header_is_refused(tmp_path):
+    path = os.path.join(tmp_path, 'r.0.0.bin')
+    RegionFile(path).close()
+    with open(path, 'r+b') as f:
+        f.write(HEADER.pack(MAGIC, 99, 16, 64, REGION_SIZE))
+    with pytest.raises(ValueError, match='not a compatible region file'):
+        RegionFile(path)
+    store = RegionStore(tmp_path)
+    with pytest.raises(ValueError):
+        store.load(0, 0)
+    store.close()
@@ -0,0 +1,23 @@
+from streaming import ChunkStreamer, chunks_in_radius
+
+
+def test_failed_chunks_are_handed_back_and_retried():
+    failing = {(0, 0), (1, 0)}
+
+    def generate(cx, cz):
+        if (cx, cz) in failing:
+            raise ValueError('incompatible region header')
+        return (cx, cz)
+
+    streamer = ChunkStreamer(generate, 1, 2, threads=2)
+    try:
+        # Would block forever if a failure left its chunk pending
+        loaded, _ = streamer.update((0, 0), wait=True)
+        assert not streamer.pending
+        assert {chunk for chunk, _ in loaded} == set(chunks_in_radius((0, 0), 1)) - failing
+        failing.clear()
+        # (0, 0) is still in range of the new centre, so it's asked for again
+        streamer.update((0, 1), wait=True)
+        assert (0, 0) in streamer.loaded
+    finally:
+        streamer.stop()
@@ -0,0 +1,50 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import terrain
+from terrain import (ChunkGeneratorPool, generate_chunk, generate_region, generate_region_scalar,
+                     generate_surface, set_seed)
+
+SEED = 777
+
+
+def test_pool_matches_in_process_generation():
+    chunks = [(cx, cz) for cx in range(-2, 2) for cz in range(-2, 2)]
+    random.Random(SEED).shuffle(chunks)
+    pool = ChunkGeneratorPool(SEED, workers=2)
+    try:
+        generated = pool.generate_many(chunks)
+    finally:
+        pool.shutdown()
+    set_seed(SEED)
+    assert len(generated) == len(chunks)
+    for (cx, cz), blocks in zip(chunks, generated):
+        assert np.array_equal(blocks, generate_chunk(cx, cz)), (cx, cz)
+
+
+@pytest.mark.parametrize('seed', (1, 777, 123456))
+@pytest.mark.parametrize('x0, z0', ((0, 0), (-37, 5), (200, -450), (-1000, -16)))
+def test_region_matches_scalar_reference(seed, x0, z0):
+    set_seed(seed)
+    # Uncached, so the scalar path calls PerlinNoise itself
+    terrain.biome_noise_cache.resize(0)
+    terrain.height_noise_cache.resize(0)
+    expected = generate_region_scalar(x0, z0, 20, 12)
+    for got, want in zip(generate_region(x0, z0, 20, 12), expected):
+        assert got.dtype == want.dtype
+        assert np.array_equal(got, want)
+
+
+def test_surface_is_the_same_from_many_threads():
+    set_seed(SEED)
+    tiles = [(x0, z0) for x0 in range(-256, 256, 64) for z0 in range(-256, 256, 64)]
+    expected = [generate_surface(x0, z0, 64, 64, 4) for x0, z0 in tiles]
+    set_seed(SEED)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        got = list(executor.map(lambda tile: generate_surface(tile[0], tile[1], 64, 64, 4), tiles))
+    for (heights, surface), (want_heights, want_surface) in zip(got, expected):
+        assert np.array_equal(heights, want_heights)
+        assert np.array_equal(surface, want_surface)
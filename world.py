@@ -0,0 +1,173 @@
+"""World storage: chunks of block IDs, looked up by integer grid position."""
+
+import math
+
+import numpy as np
+
+# Chunks are CHUNK_SIZE x CHUNK_SIZE columns of the full world height
+CHUNK_SIZE = 16
+WORLD_HEIGHT = 64
+
+
+def grid_key(pos):
+    """Round a position (Vec3 or tuple) to its integer (x, y, z) cell."""
+    return (round(pos[0]), round(pos[1]), round(pos[2]))
+
+
+def chunk_key(x, z):
+    """(cx, cz) of the chunk holding integer column (x, z)."""
+    return (x // CHUNK_SIZE, z // CHUNK_SIZE)
+
+
+class BlockIndex:
+    """The loaded world as one block-ID array per chunk.
+
+    chunks[(cx, cz)][x, z, y] is the ID (see blocks.py) of the block at
+    column (x, z) counted from the chunk's corner, 0 for air. A block costs
+    one byte and a lookup is a dict hit plus an array index.
+    """
+
+    def __init__(self):
+        self.chunks = {}  # (cx, cz) -> (CHUNK_SIZE, CHUNK_SIZE, WORLD_HEIGHT) uint8 array
+
+    def get(self, pos):
+        """Block ID at pos; 0 for air, unloaded chunks and outside the world."""
+        x, y, z = grid_key(pos)
+        return self.block_at(x, y, z)
+
+    def block_at(self, x, y, z):
+        """get() for integer coordinates, skipping the rounding."""
+        blocks = self.chunks.get((x // CHUNK_SIZE, z // CHUNK_SIZE))
+        if blocks is None or not 0 <= y < WORLD_HEIGHT:
+            return 0
+        return int(blocks[x % CHUNK_SIZE, z % CHUNK_SIZE, y])
+
+    def blocks_at(self, xs, ys, zs):
+        """block_at() for whole arrays of integer coordinates at once."""
+        xs, ys, zs = np.asarray(xs), np.asarray(ys), np.asarray(zs)
+        result = np.zeros(xs.shape, np.uint8)
+        inside = (ys >= 0) & (ys < WORLD_HEIGHT)
+        cxs, czs = xs // CHUNK_SIZE, zs // CHUNK_SIZE
+        for cx, cz in set(zip(cxs[inside].tolist(), czs[inside].tolist())):
+            blocks = self.chunks.get((cx, cz))
+            if blocks is None:
+                continue
+            sel = inside & (cxs == cx) & (czs == cz)
+            result[sel] = blocks[xs[sel] % CHUNK_SIZE, zs[sel] % CHUNK_SIZE, ys[sel]]
+        return result
+
+    def set(self, pos, block):
+        """Set the block ID at pos (0 removes it).
+
+        Returns False, changing nothing, if the chunk isn't loaded or pos is
+        above or below the world.
+        """
+        x, y, z = grid_key(pos)
+        blocks = self.chunks.get(chunk_key(x, z))
+        if blocks is None or not 0 <= y < WORLD_HEIGHT:
+            return False
+        blocks[x % CHUNK_SIZE, z % CHUNK_SIZE, y] = block
+        return True
+
+    def add_chunk(self, cx, cz, blocks):
+        """Add a loaded or freshly generated chunk's block array."""
+        self.chunks[(cx, cz)] = blocks
+
+    def remove_chunk(self, cx, cz):
+        """Drop a chunk, e.g. when it is unloaded, and return its block array."""
+        return self.chunks.pop((cx, cz), None)
+
+    def chunk_blocks(self, cx, cz):
+        """The chunk's block array, or None if it isn't loaded."""
+        return self.chunks.get((cx, cz))
+
+    def column_top(self, x, z):
+        """Highest occupied y in the column, or None if it is empty."""
+        x, z = round(x), round(z)
+        blocks = self.chunks.get(chunk_key(x, z))
+        if blocks is None:
+            return None
+        ys = np.flatnonzero(blocks[x % CHUNK_SIZE, z % CHUNK_SIZE])
+        return int(ys[-1]) if len(ys) else None
+
+    def padded_chunk(self, cx, cz):
+        """The chunk's blocks with a one-block border taken from its neighbours.
+
+        The result is (CHUNK_SIZE + 2, CHUNK_SIZE + 2, WORLD_HEIGHT + 2) with
+        the chunk at [1:-1, 1:-1, 1:-1]. The border is air above and below
+        the world and next to chunks that aren't loaded.
+        """
+        padded = np.zeros((CHUNK_SIZE + 2, CHUNK_SIZE + 2, WORLD_HEIGHT + 2), np.uint8)
+        padded[1:-1, 1:-1, 1:-1] = self.chunks[(cx, cz)]
+        east = self.chunks.get((cx + 1, cz))
+        if east is not None:
+            padded[-1, 1:-1, 1:-1] = east[0]
+        west = self.chunks.get((cx - 1, cz))
+        if west is not None:
+            padded[0, 1:-1, 1:-1] = west[-1]
+        south = self.chunks.get((cx, cz + 1))
+        if south is not None:
+            padded[1:-1, -1, 1:-1] = south[:, 0]
+        north = self.chunks.get((cx, cz - 1))
+        if north is not None:
+            padded[1:-1, 0, 1:-1] = north[:, -1]
+        return padded
+
+    def chunks_touching(self, pos):
+        """Chunks whose mesh can change when the block at pos changes.
+
+        That is the block's own chunk plus any neighbour it sits on the border of.
+        """
+        x, y, z = grid_key(pos)
+        keys = {chunk_key(x, z)}
+        for dx, dz in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            keys.add(chunk_key(x + dx, z + dz))
+        return keys
+
+    def raycast(self, origin, direction, max_distance):
+        """Walk the grid cells along a ray (Amanatides-Woo) to the first block.
+
+        Returns ((x, y, z), face normal, distance) or None if nothing is hit
+        within max_distance. The normal points out of the face the ray
+        entered through; it is (0, 0, 0) if the origin is inside a block.
+        """
+        length = math.sqrt(direction[0] ** 2 + direction[1] ** 2 + direction[2] ** 2)
+        if length == 0:
+            return None
+        # Shift into cell space, where block (x, y, z) fills [x, x+1) on every
+        # axis (blocks hang down from their y, like the old origin_y=0.5 cube)
+        origin = (origin[0] + 0.5, origin[1] + 1, origin[2] + 0.5)
+        cell = [math.floor(origin[0]), math.floor(origin[1]), math.floor(origin[2])]
+        step = [0, 0, 0]
+        t_max = [math.inf, math.inf, math.inf]
+        t_delta = [math.inf, math.inf, math.inf]
+        for axis in range(3):
+            d = direction[axis] / length
+            if d > 0:
+                step[axis] = 1
+                t_delta[axis] = 1 / d
+                t_max[axis] = (cell[axis] + 1 - origin[axis]) * t_delta[axis]
+            elif d < 0:
+                step[axis] = -1
+                t_delta[axis] = -1 / d
+                t_max[axis] = (origin[axis] - cell[axis]) * t_delta[axis]
+
+        normal = (0, 0, 0)
+        t = 0
+        while t <= max_distance:
+            if self.block_at(cell[0], cell[1], cell[2]):
+                return (cell[0], cell[1], cell[2]), normal, t
+            # Step into the neighbouring cell whose boundary the ray crosses first
+            if t_max[0] < t_max[1] and t_max[0] < t_max[2]:
+                axis = 0
+            elif t_max[1] < t_max[2]:
+                axis = 1
+            else:
+                axis = 2
+            t = t_max[axis]
+            t_max[axis] += t_delta[axis]
+            cell[axis] += step[axis]
+            normal = [0, 0, 0]
+            normal[axis] = -step[axis]
+            normal = tuple(normal)
+        return None